@@ -16,7 +16,7 @@ Author: Cosmic Diary System
 Date: 2025-12-12
 """
 
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 
 
 # Aspect rules for each planet in Vedic astrology
@@ -93,6 +93,18 @@ def get_aspect_type_name(planet_name: str, offset: int) -> str:
         return f'drishti_{offset}th'
 
 
+# (to_house, aspect_type) pairs for every planet/house combination, built once
+# at import so calculate_all_aspects() only does table lookups per chart
+ASPECT_TARGETS: Dict[Tuple[str, int], Tuple[Tuple[int, str], ...]] = {
+    (planet_name, house): tuple(
+        (calculate_target_house(house, offset), get_aspect_type_name(planet_name, offset))
+        for offset in offsets
+    )
+    for planet_name, offsets in ASPECT_RULES.items()
+    for house in range(1, 13)
+}
+
+
 def calculate_all_aspects(
     planets: Dict[str, Dict[str, Any]],
     house_cusps: Optional[List[float]] = None
@@ -183,9 +195,6 @@ def calculate_all_aspects(
                 f"House must be between 1 and 12."
             )
         
-        # Get aspect rules for this planet
-        aspect_offsets = ASPECT_RULES[planet_name]
-        
         # Get planet's rasi name (handle nested structure)
         planet_rasi_data = planet_data.get('rasi', {})
         if isinstance(planet_rasi_data, dict):
@@ -202,11 +211,8 @@ def calculate_all_aspects(
         # Get planet's strength if available
         planet_strength = planet_data.get('strength', planet_data.get('strength_score', None))
         
-        # Calculate aspects for each offset
-        for offset in aspect_offsets:
-            target_house = calculate_target_house(planet_house, offset)
-            aspect_type = get_aspect_type_name(planet_name, offset)
-            
+        # Look up precomputed target houses for this planet's position
+        for target_house, aspect_type in ASPECT_TARGETS[(planet_name, planet_house)]:
             # Create aspect entry
             aspect = {
                 "planet": planet_name,
@@ -7,13 +7,18 @@ using Swiss Ephemeris.
 
 import swisseph as swe
 from datetime import datetime, date, time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 import pytz
 from timezonefinder import TimezoneFinder
 
 # Swiss Ephemeris settings
 AYANAMSA = swe.SIDM_LAHIRI  # Lahiri ayanamsa
 HOUSE_SYSTEM = b'P'  # Placidus house system
+SIDEREAL_FLAGS = swe.FLG_SIDEREAL | swe.FLG_SWIEPH
+
+# Sidereal mode is process-global in Swiss Ephemeris; set it once at import
+# instead of on every chart/planet calculation
+swe.set_sid_mode(AYANAMSA)
 
 # Planet constants (Swiss Ephemeris planet numbers)
 PLANETS = {
@@ -52,6 +57,15 @@ RASI_LORDS = {
 # Nakshatra boundaries (27 nakshatras, each ~13.33 degrees)
 NAKSHATRA_SIZE = 360.0 / 27
 
+# Nakshatra names (simplified - you may want full names)
+NAKSHATRA_NAMES = [
+    'Ashwini', 'Bharani', 'Krittika', 'Rohini', 'Mrigashira', 'Ardra',
+    'Punarvasu', 'Pushya', 'Ashlesha', 'Magha', 'Purva Phalguni', 'Uttara Phalguni',
+    'Hasta', 'Chitra', 'Swati', 'Vishakha', 'Anuradha', 'Jyeshta',
+    'Mula', 'Purva Ashadha', 'Uttara Ashadha', 'Shravana', 'Dhanishta', 'Shatabhisha',
+    'Purva Bhadrapada', 'Uttara Bhadrapada', 'Revati'
+]
+
 # Exaltation degrees (planet: degree in zodiac)
 EXALTATION = {
     'Sun': 10.0,      # Aries 10°
@@ -87,6 +101,38 @@ OWN_SIGNS = {
     'Ketu': []
 }
 
+# Boolean flags reported per planet by calculate_planetary_strengths()
+STRENGTH_FLAGS = ('exalted', 'debilitated', 'own_sign', 'dig_bala', 'combusted')
+
+# Dig Bala (Directional Strength) - houses where each planet is strong
+DIG_BALA_HOUSES = {
+    'Sun': [10],
+    'Moon': [4],
+    'Mars': [10],
+    'Mercury': [1],
+    'Jupiter': [1],
+    'Venus': [4],
+    'Saturn': [7],
+    'Rahu': [],
+    'Ketu': []
+}
+
+
+class ChartData(TypedDict):
+    """Shape of the chart returned by calculate_complete_chart() (all keys always present)"""
+    ascendant_degree: float
+    ascendant_rasi: str
+    ascendant_rasi_number: int
+    ascendant_nakshatra: str
+    ascendant_lord: str
+    house_cusps: List[float]
+    house_system: str
+    julian_day: float
+    sidereal_time: float
+    ayanamsa: float
+    planetary_positions: Dict[str, Dict[str, Any]]
+    planetary_strengths: Dict[str, Dict[str, Any]]
+
 
 def degrees_to_rasi(longitude: float) -> Dict:
     """Convert longitude to rasi (zodiac sign)"""
@@ -108,22 +154,43 @@ def degrees_to_nakshatra(longitude: float) -> Dict:
     nakshatra_num = min(nakshatra_num, 27)  # Ensure 1-27 range
     pada = int((lon % NAKSHATRA_SIZE) / (NAKSHATRA_SIZE / 4)) + 1
     
-    # Nakshatra names (simplified - you may want full names)
-    nakshatra_names = [
-        'Ashwini', 'Bharani', 'Krittika', 'Rohini', 'Mrigashira', 'Ardra',
-        'Punarvasu', 'Pushya', 'Ashlesha', 'Magha', 'Purva Phalguni', 'Uttara Phalguni',
-        'Hasta', 'Chitra', 'Swati', 'Vishakha', 'Anuradha', 'Jyeshta',
-        'Mula', 'Purva Ashadha', 'Uttara Ashadha', 'Shravana', 'Dhanishta', 'Shatabhisha',
-        'Purva Bhadrapada', 'Uttara Bhadrapada', 'Revati'
-    ]
-    
     return {
-        'name': nakshatra_names[nakshatra_num - 1],
+        'name': NAKSHATRA_NAMES[nakshatra_num - 1],
         'number': nakshatra_num,
         'pada': min(pada, 4)
     }
 
 
+def ascendant_from_houses(ascendant_degree_tropical: float, ayanamsa: float) -> Dict:
+    """
+    Build ascendant information from the tropical ascendant returned by swe.houses()
+    
+    Args:
+        ascendant_degree_tropical: ascmc[0] from swe.houses()
+        ayanamsa: Ayanamsa for the same Julian Day
+    
+    Returns:
+        Dictionary with ascendant information
+    """
+    # Convert to sidereal (subtract ayanamsa)
+    sidereal_asc = swe.degnorm(ascendant_degree_tropical - ayanamsa)
+    
+    # Convert to rasi
+    asc_rasi = degrees_to_rasi(sidereal_asc)
+    
+    # Get nakshatra
+    asc_nakshatra = degrees_to_nakshatra(sidereal_asc)
+    
+    return {
+        'ascendant_degree': round(sidereal_asc, 6),
+        'ascendant_rasi': asc_rasi['name'],
+        'ascendant_rasi_number': asc_rasi['number'],
+        'ascendant_nakshatra': asc_nakshatra['name'],
+        'ascendant_lord': asc_rasi['lord']['name'],
+        'ayanamsa': round(ayanamsa, 6)
+    }
+
+
 def calculate_ascendant(jd: float, lat: float, lng: float) -> Dict:
     """
     Calculate ascendant (Lagna) using swe.houses()
@@ -137,9 +204,6 @@ def calculate_ascendant(jd: float, lat: float, lng: float) -> Dict:
         Dictionary with ascendant information
     """
     try:
-        # Set sidereal mode first
-        swe.set_sid_mode(AYANAMSA)
-        
         # Get ayanamsa value
         ayanamsa = swe.get_ayanamsa_ut(jd)
         
@@ -154,25 +218,7 @@ def calculate_ascendant(jd: float, lat: float, lng: float) -> Dict:
             raise ValueError(f"Error calculating houses: {str(e)}")
         
         # Ascendant is in ascmc[0] (tropical)
-        ascendant_degree_tropical = ascmc[0]
-        
-        # Convert to sidereal (subtract ayanamsa)
-        sidereal_asc = swe.degnorm(ascendant_degree_tropical - ayanamsa)
-        
-        # Convert to rasi
-        asc_rasi = degrees_to_rasi(sidereal_asc)
-        
-        # Get nakshatra
-        asc_nakshatra = degrees_to_nakshatra(sidereal_asc)
-        
-        return {
-            'ascendant_degree': round(sidereal_asc, 6),
-            'ascendant_rasi': asc_rasi['name'],
-            'ascendant_rasi_number': asc_rasi['number'],
-            'ascendant_nakshatra': asc_nakshatra['name'],
-            'ascendant_lord': asc_rasi['lord']['name'],
-            'ayanamsa': round(ayanamsa, 6)
-        }
+        return ascendant_from_houses(ascmc[0], ayanamsa)
     
     except Exception as e:
         raise ValueError(f"Error calculating ascendant: {str(e)}")
@@ -225,16 +271,13 @@ def calculate_planetary_positions(jd: float, house_cusps: List[float]) -> List[D
     """
     planets_data = []
     
-    # Set sidereal mode
-    swe.set_sid_mode(AYANAMSA)
-    
     for planet_name in PLANETS.keys():
         try:
             planet_num = PLANETS[planet_name]
             
             # Special handling for Ketu
             if planet_name == 'Ketu':
-                rahu_result = swe.calc_ut(jd, PLANETS['Rahu'], swe.FLG_SIDEREAL | swe.FLG_SWIEPH)
+                rahu_result = swe.calc_ut(jd, PLANETS['Rahu'], SIDEREAL_FLAGS)
                 if not rahu_result:
                     continue
                 
@@ -253,7 +296,7 @@ def calculate_planetary_positions(jd: float, house_cusps: List[float]) -> List[D
                 }
             else:
                 # Calculate planet position (sidereal)
-                result = swe.calc_ut(jd, planet_num, swe.FLG_SIDEREAL | swe.FLG_SWIEPH)
+                result = swe.calc_ut(jd, planet_num, SIDEREAL_FLAGS)
                 
                 if not result:
                     continue
@@ -305,6 +348,7 @@ def calculate_planetary_strengths(planets: List[Dict], asc_rasi: str) -> Dict:
         Dictionary with strength calculations for each planet
     """
     strengths = {}
+    sun_planet = next((p for p in planets if p['name'] == 'Sun'), None)
     
     for planet in planets:
         planet_name = planet['name']
@@ -339,25 +383,12 @@ def calculate_planetary_strengths(planets: List[Dict], asc_rasi: str) -> Dict:
         dig_bala = False
         house = planet.get('house', 0)
         
-        dig_bala_rules = {
-            'Sun': [10],
-            'Moon': [4],
-            'Mars': [10],
-            'Mercury': [1],
-            'Jupiter': [1],
-            'Venus': [4],
-            'Saturn': [7],
-            'Rahu': [],
-            'Ketu': []
-        }
-        
-        if planet_name in dig_bala_rules:
-            dig_bala = house in dig_bala_rules[planet_name]
+        if planet_name in DIG_BALA_HOUSES:
+            dig_bala = house in DIG_BALA_HOUSES[planet_name]
         
         # Combustion check (planet too close to Sun)
         is_combusted = False
         if planet_name not in ['Sun', 'Rahu', 'Ketu']:
-            sun_planet = next((p for p in planets if p['name'] == 'Sun'), None)
             if sun_planet:
                 sun_long = sun_planet['longitude']
                 diff = abs((longitude % 360) - (sun_long % 360))
@@ -405,7 +436,7 @@ def calculate_complete_chart(
     latitude: float,
     longitude: float,
     timezone_str: str = 'UTC'
-) -> Dict:
+) -> ChartData:
     """
     Main function to calculate complete astrological chart
     
@@ -444,21 +475,20 @@ def calculate_complete_chart(
         # Calculate Julian Day with time
         jd = swe.julday(year, month, day, (hour + minute/60.0 + second/3600.0) / 24.0, swe.GREG_CAL)
         
-        # Calculate ascendant and get ayanamsa
-        asc_data = calculate_ascendant(jd, latitude, longitude)
-        ayanamsa = asc_data['ayanamsa']
-        
-        # Get sidereal time
-        sidereal_time = swe.sidtime(jd)  # Returns sidereal time in hours
-        
-        # Calculate house cusps (sidereal)
-        swe.set_sid_mode(AYANAMSA)
+        # Calculate houses once; the ascendant and the cusps both come from it
+        ayanamsa_raw = swe.get_ayanamsa_ut(jd)
         try:
             result = swe.houses(jd, latitude, longitude, HOUSE_SYSTEM)
             cusps, ascmc = result
         except Exception as e:
             raise ValueError(f"Error calculating house cusps: {str(e)}")
         
+        asc_data = ascendant_from_houses(ascmc[0], ayanamsa_raw)
+        ayanamsa = asc_data['ayanamsa']
+        
+        # Get sidereal time
+        sidereal_time = swe.sidtime(jd)  # Returns sidereal time in hours
+        
         # Extract house cusps (1-12) and convert to sidereal
         # swe.houses() returns cusps as a tuple with 12 elements (indices 0-11)
         # cusps[0] = House 1, cusps[1] = House 2, ..., cusps[11] = House 12
@@ -15,10 +15,15 @@ Date: 2025-12-12
 
 import os
 import sys
+import re
 import json
+import heapq
+import asyncio
+from collections import Counter
+from operator import itemgetter
 from datetime import datetime, timezone, date, time, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -32,7 +37,10 @@ if env_path.exists():
     load_dotenv(dotenv_path=env_path, override=False)
 
 # Database and API clients
+import httpx
+import requests
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from openai import OpenAI
 
 # Geocoding for location lookup
@@ -45,10 +53,11 @@ except ImportError:
     print("⚠️  geopy not available - will skip geocoding")
 
 # Our astrological calculation modules
-from astro_calculations import calculate_complete_chart
-from aspect_calculator import calculate_all_aspects
+from astro_calculations import calculate_complete_chart, ChartData, STRENGTH_FLAGS
 from correlation_analyzer import (
     correlate_event_with_snapshot,
+    get_chart_aspects,
+    get_retrograde_mask,
     extract_retrograde_planets,
     extract_planet_houses,
     extract_planet_rasis
@@ -57,6 +66,9 @@ from correlation_analyzer import (
 # Event quality filtering system
 from event_quality_filter import apply_event_filters
 
+# Bulk inserts shared with import_automated_events.py
+from db_inserts import insert_rows
+
 # Timezone utilities - define inline since it's simple
 def normalize_timezone(timezone_str: str, latitude: float = None, longitude: float = None) -> str:
     """
@@ -107,7 +119,6 @@ def normalize_timezone(timezone_str: str, latitude: float = None, longitude: flo
             return iana_tz
     
     # Try to parse UTC offset format
-    import re
     offset_pattern = r'UTC([+-])(\d{1,2}):?(\d{2})?'
     match = re.match(offset_pattern, timezone_str, re.IGNORECASE)
     if match:
@@ -163,6 +174,62 @@ REFERENCE_LOCATION = {
     "timezone": "Asia/Kolkata"
 }
 
+# Map OpenAI category variations to our standard categories
+CATEGORY_MAPPING = {
+    'natural disaster': 'Natural Disasters',
+    'natural disasters': 'Natural Disasters',
+    'economic event': 'Economic Events',
+    'economic events': 'Economic Events',
+    'economic': 'Economic Events',
+    'political event': 'Political Events',
+    'political events': 'Political Events',
+    'political': 'Political Events',
+    'health crisis': 'Health & Medical',
+    'health & medical': 'Health & Medical',
+    'health': 'Health & Medical',
+    'medical': 'Health & Medical',
+    'technology': 'Technology & Innovation',
+    'tech': 'Technology & Innovation',
+    'technology & innovation': 'Technology & Innovation',
+    'business': 'Business & Commerce',
+    'commerce': 'Business & Commerce',
+    'business & commerce': 'Business & Commerce',
+    'war': 'Wars & Conflicts',
+    'conflict': 'Wars & Conflicts',
+    'wars & conflicts': 'Wars & Conflicts',
+    'employment': 'Employment & Labor',
+    'labor': 'Employment & Labor',
+    'employment & labor': 'Employment & Labor',
+    'women & children': 'Women & Children',
+    'entertainment': 'Entertainment & Sports',
+    'sports': 'Entertainment & Sports',
+    'entertainment & sports': 'Entertainment & Sports',
+}
+
+# Minimum strength_score for a planet to be recorded as dominant in a snapshot
+DOMINANT_STRENGTH_THRESHOLD = 0.7
+
+# Maximum events processed per run (highest research score first)
+MAX_EVENTS_PER_RUN = 15
+
+# Verbose diagnostics (raw OpenAI response preview, sample event JSON)
+COLLECTION_DEBUG = os.getenv('COLLECTION_DEBUG', '').lower() == 'true'
+
+# Event date/time formats from OpenAI/NewsAPI ('YYYY-MM-DD', 'HH[:MM[:SS]]')
+DATE_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+TIME_PATTERN = re.compile(r'^(\d{1,2})(?::(\d{1,2}))?(?::(\d{1,2}))?$')
+
+# Events already stored by previous runs, keyed by (title, date)
+SEEN_EVENTS_PATH = SCRIPT_DIR / '.seen_events.json'
+SEEN_EVENTS_RETENTION_DAYS = 3  # Matches the 72-hour deduplication window
+
+# OpenAI request timeout (a detection completion normally takes well under a minute)
+OPENAI_TIMEOUT_SECONDS = 90.0
+
+# Completion budget for event detection (MAX_EVENTS_PER_RUN events with full
+# descriptions); completion_tokens is logged each run to tune this against real usage
+OPENAI_MAX_TOKENS = 3500
+
 # Initialize clients
 SUPABASE_URL = os.getenv('SUPABASE_URL', '')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY', os.getenv('SUPABASE_KEY', ''))
@@ -177,13 +244,29 @@ if not OPENAI_API_KEY:
     print("   Please set OPENAI_API_KEY environment variable in Railway settings.")
     sys.exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# One client per process: supabase-py builds its PostgREST session lazily and
+# keeps it on the client, so every insert below reuses the same keep-alive
+# connection pool instead of paying a fresh TLS handshake.
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(postgrest_client_timeout=30)
+)
+
+# Shared HTTP session for external APIs (NewsAPI) - reuses connections across calls
+http_session = requests.Session()
 
 # Initialize OpenAI client (will be None if API key is missing, but we check above)
 openai_client = None
 if OPENAI_API_KEY:
     try:
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        # The client keeps one pooled httpx connection for the process; the default
+        # timeout is 10 minutes, which would eat most of the 15-minute Actions job
+        openai_client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=5.0),
+            max_retries=2
+        )
         print("✓ OpenAI client initialized successfully")
     except Exception as e:
         print(f"❌ ERROR: Failed to initialize OpenAI client: {e}")
@@ -193,9 +276,20 @@ else:
     sys.exit(1)
 
 
-def print_header():
+def flush_output():
+    """
+    Flush buffered stdout at a phase boundary.
+
+    main() switches stdout to block buffering so the hundreds of progress lines
+    per run don't each cost a write() syscall; flushing at phase boundaries keeps
+    the log readable in real time. Also called before tracebacks so stderr stays
+    in order with stdout.
+    """
+    sys.stdout.flush()
+
+
+def print_header(run_time: datetime):
     """Print script header with run time."""
-    run_time = datetime.now(timezone.utc)
     print("=" * 80)
     print("COSMIC DIARY - ENHANCED EVENT COLLECTION WITH COSMIC STATE CORRELATION")
     print(f"Run Time: {run_time.strftime('%Y-%m-%d %H:%M:%S UTC')}")
@@ -203,10 +297,46 @@ def print_header():
     print("")
 
 
-def capture_cosmic_snapshot() -> Tuple[int, Dict[str, Any]]:
+def load_seen_events() -> set:
+    """
+    Load (title, date) keys of events stored by previous runs.
+
+    Returns:
+        Set of (title, date) tuples; empty if the cache is missing or unreadable
+    """
+    if not SEEN_EVENTS_PATH.exists():
+        return set()
+    try:
+        return {tuple(key) for key in json.loads(SEEN_EVENTS_PATH.read_text())}
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️  Could not read seen-events cache: {e}")
+        return set()
+
+
+def save_seen_events(seen: set, run_time: datetime) -> None:
+    """
+    Persist (title, date) keys, dropping entries older than the retention window.
+
+    Args:
+        seen: Set of (title, date) tuples to write back
+        run_time: UTC time of the current run
+    """
+    cutoff = (run_time - timedelta(days=SEEN_EVENTS_RETENTION_DAYS)).strftime('%Y-%m-%d')
+    recent = [list(key) for key in seen if key[1] and key[1] >= cutoff]
+    try:
+        SEEN_EVENTS_PATH.write_text(json.dumps(recent))
+    except OSError as e:
+        print(f"⚠️  Could not write seen-events cache: {e}")
+
+
+def capture_cosmic_snapshot(run_time: Optional[datetime] = None) -> Tuple[int, ChartData]:
     """
     Capture current planetary state at reference location.
     
+    Args:
+        run_time: UTC time of the snapshot (defaults to now); main() passes the
+                  same timestamp it printed in the header
+    
     Returns:
         Tuple of (snapshot_id, snapshot_chart_data)
         snapshot_id: Database ID of inserted snapshot
@@ -219,8 +349,7 @@ def capture_cosmic_snapshot() -> Tuple[int, Dict[str, Any]]:
     print("-" * 80)
     
     try:
-        # Get current UTC time
-        now_utc = datetime.now(timezone.utc)
+        now_utc = run_time or datetime.now(timezone.utc)
         snapshot_time = now_utc.isoformat()
         
         # Format for chart calculation
@@ -247,35 +376,31 @@ def capture_cosmic_snapshot() -> Tuple[int, Dict[str, Any]]:
         
         # Calculate aspects
         print("⭐ Calculating planetary aspects...")
-        planetary_positions = chart_data.get('planetary_positions', {})
-        house_cusps = chart_data.get('house_cusps', [])
-        active_aspects = calculate_all_aspects(planetary_positions, house_cusps)
+        planetary_positions = chart_data['planetary_positions']
+        active_aspects = get_chart_aspects(chart_data)
         print(f"  ✓ Found {len(active_aspects)} active aspects")
         
         # Extract retrograde planets
         retrograde_planets = extract_retrograde_planets(chart_data)
         print(f"  ✓ Retrograde planets: {', '.join(retrograde_planets) if retrograde_planets else 'None'}")
         
-        # Extract dominant planets (strength_score >= 0.7)
-        dominant_planets = []
-        planetary_strengths = chart_data.get('planetary_strengths', {})
-        if isinstance(planetary_strengths, dict):
-            for planet_name, strength_data in planetary_strengths.items():
-                if isinstance(strength_data, dict):
-                    strength_score = strength_data.get('strength_score', 0.0)
-                    if strength_score >= 0.7:
-                        dominant_planets.append({
-                            "planet": planet_name,
-                            "strength_score": strength_score,
-                            "reasons": [
-                                k for k, v in strength_data.items()
-                                if k != 'strength_score' and v is True
-                            ]
-                        })
-        
-        # Sort by strength
-        dominant_planets.sort(key=lambda x: x['strength_score'], reverse=True)
-        print(f"  ✓ Dominant planets: {len(dominant_planets)} planets with strength >= 0.7")
+        # Extract dominant planets (strength_score >= 0.7), strongest first
+        planetary_strengths = chart_data['planetary_strengths']
+        dominant_planets = sorted(
+            (
+                {
+                    "planet": planet_name,
+                    "strength_score": strength_data['strength_score'],
+                    "reasons": [flag for flag in STRENGTH_FLAGS if strength_data.get(flag) is True]
+                }
+                for planet_name, strength_data in planetary_strengths.items()
+                if isinstance(strength_data, dict)
+                and strength_data.get('strength_score', 0.0) >= DOMINANT_STRENGTH_THRESHOLD
+            ),
+            key=itemgetter('strength_score'),
+            reverse=True
+        )
+        print(f"  ✓ Dominant planets: {len(dominant_planets)} planets with strength >= {DOMINANT_STRENGTH_THRESHOLD}")
         
         # Get Moon details
         moon_data = planetary_positions.get('Moon', {})
@@ -298,19 +423,19 @@ def capture_cosmic_snapshot() -> Tuple[int, Dict[str, Any]]:
             "reference_latitude": REFERENCE_LOCATION['latitude'],
             "reference_longitude": REFERENCE_LOCATION['longitude'],
             "reference_timezone": REFERENCE_LOCATION['timezone'],
-            "lagna_degree": chart_data.get('ascendant_degree', 0.0),
-            "lagna_rasi": chart_data.get('ascendant_rasi', ''),
-            "lagna_rasi_number": chart_data.get('ascendant_rasi_number', 1),
-            "lagna_nakshatra": chart_data.get('ascendant_nakshatra'),
-            "lagna_lord": chart_data.get('ascendant_lord', ''),
-            "house_cusps": chart_data.get('house_cusps', []),
+            "lagna_degree": chart_data['ascendant_degree'],
+            "lagna_rasi": chart_data['ascendant_rasi'],
+            "lagna_rasi_number": chart_data['ascendant_rasi_number'],
+            "lagna_nakshatra": chart_data['ascendant_nakshatra'],
+            "lagna_lord": chart_data['ascendant_lord'],
+            "house_cusps": chart_data['house_cusps'],
             "planetary_positions": planetary_positions,
             "active_aspects": active_aspects,
             "retrograde_planets": retrograde_planets,
             "dominant_planets": dominant_planets if dominant_planets else None,
             "moon_rasi": moon_rasi,
             "moon_nakshatra": moon_nakshatra,
-            "ayanamsa": chart_data.get('ayanamsa', 0.0)
+            "ayanamsa": chart_data['ayanamsa']
         }
         
         # Insert into database
@@ -326,7 +451,7 @@ def capture_cosmic_snapshot() -> Tuple[int, Dict[str, Any]]:
         
         # Print summary
         print("📊 Snapshot Summary:")
-        print(f"   Lagna: {chart_data.get('ascendant_rasi')} ({chart_data.get('ascendant_degree', 0):.2f}°)")
+        print(f"   Lagna: {chart_data['ascendant_rasi']} ({chart_data['ascendant_degree']:.2f}°)")
         print(f"   Retrograde Planets: {len(retrograde_planets)}")
         if dominant_planets:
             top_3 = dominant_planets[:3]
@@ -351,9 +476,6 @@ def fetch_newsapi_events(lookback_hours: int = 2) -> List[Dict[str, Any]]:
     Returns:
         List of event dictionaries in our standard format
     """
-    import requests
-    from datetime import timedelta
-
     api_key = os.getenv('NEWSAPI_KEY')
     if not api_key:
         return []
@@ -381,7 +503,7 @@ def fetch_newsapi_events(lookback_hours: int = 2) -> List[Dict[str, Any]]:
         print(f"   Time window: Past {lookback_hours} hours")
         print(f"   From: {from_time}")
 
-        response = requests.get(url, params=params, timeout=15)
+        response = http_session.get(url, params=params, timeout=15)
         response.raise_for_status()
         data = response.json()
 
@@ -456,6 +578,7 @@ def fetch_newsapi_events(lookback_hours: int = 2) -> List[Dict[str, Any]]:
     except Exception as e:
         print(f"❌ NewsAPI error: {e}")
         import traceback
+        flush_output()
         traceback.print_exc()
         return []
 
@@ -514,7 +637,11 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
         try:
             # For JSON mode, we need to ensure the prompt asks for JSON
             # Update user prompt to explicitly request JSON format
-            json_user_prompt = user_prompt + "\n\nIMPORTANT: Return ONLY valid JSON. Your response must be a JSON object with an 'events' array."
+            json_user_prompt = (
+                user_prompt
+                + "\n\nIMPORTANT: Return ONLY valid JSON. Your response must be a JSON object with an 'events' array"
+                + f" of at most {MAX_EVENTS_PER_RUN} events, most important first."
+            )
             
             response = openai_client.chat.completions.create(
                 model="gpt-4o-mini",
@@ -523,13 +650,14 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
                     {"role": "user", "content": json_user_prompt}
                 ],
                 temperature=0.7,
-                max_tokens=3500,  # Match import_automated_events.py
+                max_tokens=OPENAI_MAX_TOKENS,
                 response_format={"type": "json_object"}  # Force JSON response format
             )
         except Exception as api_error:
             print(f"❌ ERROR: OpenAI API call failed: {api_error}")
             print(f"   Error type: {type(api_error).__name__}")
             import traceback
+            flush_output()
             traceback.print_exc()
             raise
         
@@ -551,35 +679,26 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
         # Debug: Log response details
         print(f"📥 OpenAI response received")
         print(f"   Content length: {len(content)} characters")
-        print(f"   Preview (first 500 chars): {content[:500]}")
+        if response.usage:
+            print(f"   Completion tokens: {response.usage.completion_tokens}/{OPENAI_MAX_TOKENS}")
+        if COLLECTION_DEBUG:
+            print(f"   Preview (first 500 chars): {content[:500]}")
         
         # Check if content is empty after stripping
         if not content:
             print("❌ ERROR: Content is empty after stripping whitespace")
             return []
         
-        # Parse JSON - handle markdown code blocks (same logic as import_automated_events.py)
-        original_content = content
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-        
-        # Check again after removing markdown
-        if not content:
-            print("❌ ERROR: Content is empty after removing markdown code blocks")
-            print(f"   Original content preview: {original_content[:200]}")
-            return []
-        
+        # response_format=json_object guarantees a bare JSON object (no markdown
+        # fences); the only way it fails to parse is truncation at max_tokens
+        finish_reason = response.choices[0].finish_reason
         try:
             events = json.loads(content)
         except json.JSONDecodeError as e:
             print(f"❌ JSON parsing error at position {e.pos}: {e.msg}")
+            if finish_reason == 'length':
+                print("   Response was truncated at max_tokens - consider requesting fewer events")
             print(f"📄 Content length: {len(content)}")
-            print(f"📄 Content preview (first 1000 chars): {content[:1000]}")
             if e.pos and e.pos < len(content):
                 print(f"📄 Content around error position {e.pos}:")
                 start = max(0, e.pos - 200)
@@ -587,22 +706,7 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
                 print(f"   ...{content[start:e.pos]}>>>ERROR<<<{content[e.pos:end]}...")
             else:
                 print(f"📄 Full content: {content}")
-            
-            # Try to extract JSON from the response if it's wrapped in text
-            print("🔧 Attempting to extract JSON from response...")
-            import re
-            json_match = re.search(r'\{.*\[.*\]\.*\}', content, re.DOTALL)
-            if json_match:
-                try:
-                    extracted_json = json_match.group(0)
-                    events = json.loads(extracted_json)
-                    print("✓ Successfully extracted JSON from response")
-                except:
-                    print("✗ Failed to extract valid JSON")
-                    return []
-            else:
-                print("✗ No JSON pattern found in response")
-                return []
+            return []
         
         # Handle different response formats (same as import_automated_events.py)
         if not isinstance(events, list):
@@ -657,7 +761,7 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
         print("")
         
         # Log sample event structure for debugging
-        if events:
+        if COLLECTION_DEBUG and events:
             print("📋 Sample event structure from OpenAI:")
             print(json.dumps(events[0], indent=2)[:500] + "...")
             print("")
@@ -677,42 +781,10 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
         
         for event in events:
             # Normalize category first (before validation)
-            # Map OpenAI category variations to our standard categories
-            category_mapping = {
-                'natural disaster': 'Natural Disasters',
-                'natural disasters': 'Natural Disasters',
-                'economic event': 'Economic Events',
-                'economic events': 'Economic Events',
-                'economic': 'Economic Events',
-                'political event': 'Political Events',
-                'political events': 'Political Events',
-                'political': 'Political Events',
-                'health crisis': 'Health & Medical',
-                'health & medical': 'Health & Medical',
-                'health': 'Health & Medical',
-                'medical': 'Health & Medical',
-                'technology': 'Technology & Innovation',
-                'tech': 'Technology & Innovation',
-                'technology & innovation': 'Technology & Innovation',
-                'business': 'Business & Commerce',
-                'commerce': 'Business & Commerce',
-                'business & commerce': 'Business & Commerce',
-                'war': 'Wars & Conflicts',
-                'conflict': 'Wars & Conflicts',
-                'wars & conflicts': 'Wars & Conflicts',
-                'employment': 'Employment & Labor',
-                'labor': 'Employment & Labor',
-                'employment & labor': 'Employment & Labor',
-                'women & children': 'Women & Children',
-                'entertainment': 'Entertainment & Sports',
-                'sports': 'Entertainment & Sports',
-                'entertainment & sports': 'Entertainment & Sports',
-            }
-            
             if event.get('category'):
                 event_category_lower = event['category'].lower().strip()
-                if event_category_lower in category_mapping:
-                    event['category'] = category_mapping[event_category_lower]
+                if event_category_lower in CATEGORY_MAPPING:
+                    event['category'] = CATEGORY_MAPPING[event_category_lower]
                     print(f"  🔄 Normalized category: {event.get('category', 'Unknown')}")
             
             # First try strict validation
@@ -804,22 +876,22 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
             print("")
             return []
         
-        # Sort by research score and take top 15
-        validated_events.sort(key=lambda x: x.get('research_score', 0), reverse=True)
-        selected_events = validated_events[:15]
-        
-        # Calculate statistics
-        if selected_events:
-            scores = [e.get('research_score', 0) for e in selected_events]
-            avg_score = sum(scores) / len(scores)
-            print(f"✓ Average research score: {avg_score:.2f}/100")
-            print(f"✓ Score range: {min(scores):.2f} - {max(scores):.2f}")
+        # Take top events by research score (heap of size K instead of a full sort)
+        selected_events = heapq.nlargest(
+            MAX_EVENTS_PER_RUN, validated_events, key=lambda x: x.get('research_score', 0)
+        )
         
-        # Category breakdown
-        categories = {}
+        # Score statistics and category breakdown in one pass
+        total_score = 0.0
+        categories = Counter()
         for event in selected_events:
-            cat = event.get('category', 'Other')
-            categories[cat] = categories.get(cat, 0) + 1
+            total_score += event.get('research_score', 0)
+            categories[event.get('category', 'Other')] += 1
+        
+        if selected_events:
+            # selected_events is in descending score order
+            print(f"✓ Average research score: {total_score / len(selected_events):.2f}/100")
+            print(f"✓ Score range: {selected_events[-1].get('research_score', 0):.2f} - {selected_events[0].get('research_score', 0):.2f}")
         
         print("📊 Event Detection Summary:")
         print(f"   Events from OpenAI: {len(events)}")
@@ -837,205 +909,475 @@ def detect_events_openai(lookback_hours: int = None) -> List[Dict[str, Any]]:
     except Exception as e:
         print(f"  ✗ Error detecting events: {e}")
         import traceback
+        flush_output()
         traceback.print_exc()
         raise
 
 
-def store_event_with_chart(event: Dict[str, Any]) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+def detect_events(lookback_hours: int) -> List[Dict[str, Any]]:
     """
-    Store event in database and calculate its chart if time/location available.
-    
+    Detect events from NewsAPI (if configured) with OpenAI as fallback.
+
+    Args:
+        lookback_hours: Number of hours to look back for events
+
+    Returns:
+        List of scored event dictionaries
+
+    Raises:
+        Exception: If event detection fails
+    """
+    try:
+        # Try NewsAPI first (if key is available), then fall back to OpenAI
+        newsapi_key = os.getenv('NEWSAPI_KEY')
+
+        if newsapi_key:
+            print("🔄 Attempting NewsAPI integration first...")
+            newsapi_events = fetch_newsapi_events(lookback_hours=lookback_hours)
+
+            if len(newsapi_events) >= 5:
+                print(f"✅ Using {len(newsapi_events)} events from NewsAPI")
+                print("   (NewsAPI provides real-time news - better than OpenAI)")
+
+                # Auto-map astrological relevance for NewsAPI events
+                print("\n🔮 Auto-mapping astrological relevance for NewsAPI events...")
+                for event in newsapi_events:
+                    if not event.get('astrological_relevance'):
+                        event['astrological_relevance'] = auto_map_event_to_astrology(event)
+                    # Calculate research score
+                    event['research_score'] = calculate_research_score(event)
+
+                return newsapi_events
+
+            print(f"⚠️  NewsAPI returned only {len(newsapi_events)} events")
+            print("   Falling back to OpenAI for better coverage...")
+        else:
+            print("ℹ️  NEWSAPI_KEY not set, using OpenAI")
+            print("   Tip: Get a free NewsAPI key at https://newsapi.org/register for real-time news")
+
+        return detect_events_openai(lookback_hours=lookback_hours)
+
+    except Exception as step2_error:
+        print("")
+        print("=" * 80)
+        print("ERROR IN STEP 2: EVENT DETECTION")
+        print("=" * 80)
+        print(f"❌ Fatal error during event detection: {step2_error}")
+        import traceback
+        flush_output()
+        traceback.print_exc()
+        print("=" * 80)
+        print("")
+        raise
+
+
+async def capture_snapshot_and_detect_events(
+    lookback_hours: int,
+    run_time: datetime
+) -> Tuple[Tuple[int, ChartData], List[Dict[str, Any]]]:
+    """
+    Run STEP 1 (snapshot capture) and STEP 2 (event detection) concurrently.
+
+    Both steps are blocking (Swiss Ephemeris + supabase-py, and the OpenAI /
+    NewsAPI round trip), so each runs in a worker thread while the event loop
+    waits on both. Log lines from the two steps may interleave.
+
+    A worker thread cannot be cancelled, so if the snapshot fails the detection
+    call (up to OPENAI_TIMEOUT_SECONDS per attempt, plus client retries) still
+    runs to completion and its result is discarded. Both results are collected
+    before raising so a snapshot failure is always the error reported, rather
+    than whichever step happens to fail first.
+
+    Args:
+        lookback_hours: Number of hours to look back for events
+        run_time: UTC time of the current run (snapshot time)
+
+    Returns:
+        Tuple of ((snapshot_id, snapshot_chart), events_detected)
+
+    Raises:
+        Exception: If snapshot capture or event detection fails
+    """
+    snapshot, events_detected = await asyncio.gather(
+        asyncio.to_thread(capture_cosmic_snapshot, run_time),
+        asyncio.to_thread(detect_events, lookback_hours),
+        return_exceptions=True
+    )
+    if isinstance(snapshot, BaseException):
+        if not isinstance(events_detected, BaseException):
+            print(f"⚠️  Snapshot capture failed; discarding {len(events_detected)} detected events")
+        raise snapshot
+    if isinstance(events_detected, BaseException):
+        raise events_detected
+    return snapshot, events_detected
+
+
+def resolve_event_location(event: Dict[str, Any]) -> None:
+    """
+    Fill in missing coordinates and normalize the timezone of an event in place.
+
+    Geocodes the location name when latitude/longitude are missing, falls back
+    to Delhi for Indian locations, then normalizes the timezone using the
+    resolved coordinates so the stored row and the chart agree.
+
+    Args:
+        event: Event dictionary (mutated: latitude, longitude, timezone)
+    """
+    event_lat = event.get('latitude')
+    event_lng = event.get('longitude')
+
+    if (event_lat is None or event_lng is None) and event.get('location'):
+        print(f"    🔍 Geocoding location: {event.get('location')}")
+        try:
+            if GEOCODING_AVAILABLE:
+                geolocator = Nominatim(user_agent="cosmic-diary/1.0", timeout=10)
+                location_obj = geolocator.geocode(event.get('location'))
+                if location_obj:
+                    event_lat = location_obj.latitude
+                    event_lng = location_obj.longitude
+                    print(f"    ✓ Geocoded: {event_lat:.4f}, {event_lng:.4f}")
+                else:
+                    print(f"    ⚠️  Could not geocode location")
+        except (GeocoderTimedOut, GeocoderServiceError, Exception) as e:
+            print(f"    ⚠️  Geocoding error: {e}")
+
+    # Use default coordinates for India if still missing and location mentions India
+    if (event_lat is None or event_lng is None) and 'india' in (event.get('location') or '').lower():
+        print(f"    📍 Using default India coordinates (Delhi)")
+        event_lat = 28.6139  # Delhi
+        event_lng = 77.2090
+
+    event['latitude'] = event_lat
+    event['longitude'] = event_lng
+
+    # Normalize timezone (convert UTC+5:30 to Asia/Kolkata, etc.)
+    raw_timezone = event.get('timezone') or 'UTC'
+    timezone_str = normalize_timezone(raw_timezone, latitude=event_lat, longitude=event_lng)
+    if raw_timezone != timezone_str:
+        print(f"    🔄 Normalized timezone: {raw_timezone} → {timezone_str}")
+    event['timezone'] = timezone_str
+
+
+def build_event_row(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the `events` table row for an event (no side effects).
+
+    Args:
+        event: Event dictionary, already passed through resolve_event_location()
+
+    Returns:
+        Row dictionary matching the events table schema
+    """
+    # Extract astrological relevance if available (from prompt system)
+    astro_relevance = event.get('astrological_relevance', {})
+    astrological_metadata = None
+    if astro_relevance:
+        astrological_metadata = {
+            'primary_houses': astro_relevance.get('primary_houses', []),
+            'primary_planets': astro_relevance.get('primary_planets', []),
+            'keywords': astro_relevance.get('keywords', []),
+            'reasoning': astro_relevance.get('reasoning', '')
+        }
+
+    # Extract impact_metrics (from prompt system)
+    impact_metrics = event.get('impact_metrics', {})
+
+    # Extract sources (from prompt system)
+    sources = event.get('sources', [])
+    if not isinstance(sources, list):
+        sources = []
+
+    # Matching import_automated_events.py structure
+    return {
+        "date": event.get('date'),
+        "title": event.get('title'),
+        "description": event.get('description', ''),
+        "category": event.get('category', 'Other'),
+        "location": event.get('location', ''),
+        "latitude": event.get('latitude'),
+        "longitude": event.get('longitude'),
+        "impact_level": event.get('impact_level', 'medium'),
+        "event_type": 'world',
+        "tags": event.get('tags', []),
+        # Enhanced time fields
+        "event_time": event.get('time') if event.get('time') and event.get('time') != 'estimated' else None,
+        "timezone": event.get('timezone') or 'UTC',
+        "has_accurate_time": event.get('time') is not None and event.get('time') != 'estimated',
+        # Enhanced astrological metadata fields (from prompt system)
+        "astrological_metadata": astrological_metadata,
+        "impact_metrics": impact_metrics if impact_metrics else None,
+        "research_score": event.get('research_score'),
+        "sources": sources  # Store source URLs
+    }
+
+
+def parse_event_datetime(date_str: str, time_str: str) -> Tuple[date, time]:
+    """
+    Parse event date ('YYYY-MM-DD') and time ('HH', 'HH:MM' or 'HH:MM:SS').
+
+    Raises:
+        ValueError: If either string is not in the expected format
+    """
+    date_match = DATE_PATTERN.match(date_str)
+    time_match = TIME_PATTERN.match(time_str)
+    if not date_match or not time_match:
+        raise ValueError(f"Unrecognized date/time: {date_str} {time_str}")
+
+    year, month, day = date_match.groups()
+    hour, minute, second = time_match.groups()
+    return (
+        date(int(year), int(month), int(day)),
+        time(int(hour), int(minute or 0), int(second or 0))
+    )
+
+
+def is_chartable(event: Dict[str, Any]) -> bool:
+    """
+    Check whether an event has what a chart needs: an accurate time and coordinates.
+
+    Args:
+        event: Event dictionary, already passed through resolve_event_location()
+
+    Returns:
+        True if compute_event_chart() can attempt a chart for this event
+    """
+    # Check for both 'time' (from OpenAI) and 'event_time' (already converted)
+    event_time_str = event.get('event_time') or event.get('time')
+    return (
+        bool(event_time_str) and event_time_str != 'estimated' and
+        event.get('latitude') is not None and
+        event.get('longitude') is not None
+    )
+
+
+def compute_event_chart(event: Dict[str, Any]) -> Optional[ChartData]:
+    """
+    Calculate the chart for an event if time and coordinates are available.
+
+    Args:
+        event: Event dictionary, already passed through resolve_event_location()
+
+    Returns:
+        Chart data dictionary, or None if the chart cannot be calculated
+    """
+    if not is_chartable(event):
+        return None
+
+    try:
+        event_date, event_time_obj = parse_event_datetime(
+            event['date'], event.get('event_time') or event['time']
+        )
+
+        return calculate_complete_chart(
+            event_date=event_date,
+            event_time=event_time_obj,
+            latitude=event['latitude'],
+            longitude=event['longitude'],
+            timezone_str=event.get('timezone') or 'UTC'
+        )
+    except Exception as e:
+        print(f"    ⚠️  Could not calculate chart: {e}")
+        return None
+
+
+def compute_event_charts(events: List[Dict[str, Any]]) -> List[Optional[ChartData]]:
+    """
+    Calculate charts for a batch of events.
+
+    Args:
+        events: Event dictionaries, already passed through resolve_event_location()
+
+    Returns:
+        Chart data (or None) for each event, in input order
+    """
+    return [compute_event_chart(event) for event in events]
+
+
+def build_chart_row(event_id: int, chart_data: ChartData) -> Dict[str, Any]:
+    """
+    Build the `event_chart_data` table row for a calculated chart (no side effects).
+
+    Args:
+        event_id: Database ID of the event
+        chart_data: Chart data dictionary from calculate_complete_chart()
+
+    Returns:
+        Row dictionary matching the event_chart_data table schema
+    """
+    return {
+        "event_id": event_id,
+        "ascendant_degree": chart_data['ascendant_degree'],
+        "ascendant_rasi": chart_data['ascendant_rasi'],
+        "ascendant_rasi_number": chart_data['ascendant_rasi_number'],
+        "ascendant_nakshatra": chart_data['ascendant_nakshatra'],
+        "ascendant_lord": chart_data['ascendant_lord'],
+        "house_cusps": chart_data['house_cusps'],
+        "house_system": chart_data['house_system'],
+        "julian_day": chart_data['julian_day'],
+        "sidereal_time": chart_data['sidereal_time'],
+        "ayanamsa": chart_data['ayanamsa'],
+        "planetary_positions": chart_data['planetary_positions'],
+        "planetary_strengths": chart_data['planetary_strengths']
+    }
+
+
+def build_correlation_rows(
+    event_id: int,
+    event_date: Optional[str],
+    event_chart: Mapping[str, Any],
+    snapshot_id: int,
+    snapshot_chart: Mapping[str, Any],
+    snapshot_retrograde_mask: Optional[int] = None,
+    snapshot_aspects: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Correlate an event with the snapshot and build the rows to store (no DB access).
+
+    Args:
+        event_id: Database ID of the event
+        event_date: Event date (YYYY-MM-DD) for event_planetary_correlations
+        event_chart: Event chart data dictionary
+        snapshot_id: Database ID of the snapshot
+        snapshot_chart: Snapshot chart data dictionary
+        snapshot_retrograde_mask: get_retrograde_mask(snapshot_chart), computed
+            once per run by the caller
+        snapshot_aspects: get_chart_aspects(snapshot_chart), likewise
+
+    Returns:
+        Tuple of (event_cosmic_correlations row, event_planetary_correlations rows)
+    """
+    correlation_data = correlate_event_with_snapshot(
+        event_chart=event_chart,
+        snapshot_chart=snapshot_chart,
+        snapshot_id=snapshot_id,
+        snapshot_retrograde_mask=snapshot_retrograde_mask,
+        snapshot_aspects=snapshot_aspects
+    )
+
+    # Row for event_cosmic_correlations table (for analysis)
+    correlation_row = {
+        "event_id": event_id,
+        "snapshot_id": snapshot_id,
+        "correlation_score": correlation_data.get('correlation_score', 0.0),
+        "matching_factors": correlation_data.get('correlations', []),
+        "total_matches": correlation_data.get('total_matches', 0)
+    }
+
+    # Rows for event_planetary_correlations (for Next.js app compatibility)
+    # Extract planet-specific correlations from the correlation data
+    planetary_positions = event_chart.get('planetary_positions', {})
+    planetary_rows = []
+
+    for correlation in correlation_data.get('correlations', []):
+        corr_type = correlation.get('type', '').lower()
+        score = correlation.get('score', 0.0)
+        details = correlation.get('details', {})
+
+        # Extract planet names from correlation descriptions
+        planets_to_store = []
+
+        if 'retrograde' in corr_type:
+            for planet in details.get('matching_planets', []):
+                planets_to_store.append((planet, f"{planet} retrograde correlation"))
+
+        elif 'house' in corr_type:
+            for match in details.get('matching_planets', []):
+                planet = match.get('planet', '')
+                if planet:
+                    planets_to_store.append((planet, f"{planet} in house {match.get('house', '')}"))
+
+        elif 'rasi' in corr_type:
+            for match in details.get('matching_planets', []):
+                planet = match.get('planet', '')
+                if planet:
+                    planets_to_store.append((planet, f"{planet} in {match.get('rasi', '')}"))
+
+        elif 'aspect' in corr_type:
+            for aspect in details.get('matching_aspects', []):
+                planet1 = aspect.get('planet1', '')
+                if planet1:
+                    planets_to_store.append(
+                        (planet1, f"{planet1} {aspect.get('type', '')} {aspect.get('planet2', '')}")
+                    )
+
+        for planet_name, reason in planets_to_store:
+            if planet_name in planetary_positions:
+                planetary_rows.append({
+                    "event_id": event_id,
+                    "date": event_date,
+                    "planet_name": planet_name,
+                    "planet_position": planetary_positions[planet_name],
+                    "correlation_score": score,
+                    "reason": reason
+                })
+
+    return correlation_row, planetary_rows
+
+
+async def insert_child_rows(
+    chart_rows: List[Dict[str, Any]],
+    correlation_rows: List[Dict[str, Any]],
+    planetary_rows: List[Dict[str, Any]]
+) -> Tuple[List[Optional[Dict[str, Any]]], ...]:
+    """
+    Insert chart, correlation and planetary correlation rows concurrently.
+
+    The three tables only reference events (already stored), not each other,
+    so the bulk inserts run in worker threads at the same time and the DB
+    phase takes as long as the slowest insert rather than their sum.
+
+    Args:
+        chart_rows: Rows for event_chart_data
+        correlation_rows: Rows for event_cosmic_correlations
+        planetary_rows: Rows for event_planetary_correlations
+
+    Returns:
+        Tuple of insert_rows() results in the same order as the arguments
+    """
+    return tuple(await asyncio.gather(
+        asyncio.to_thread(insert_rows, supabase, 'event_chart_data', chart_rows),
+        asyncio.to_thread(insert_rows, supabase, 'event_cosmic_correlations', correlation_rows),
+        asyncio.to_thread(insert_rows, supabase, 'event_planetary_correlations', planetary_rows)
+    ))
+
+
+def store_event_with_chart(event: Dict[str, Any]) -> Tuple[Optional[int], Optional[ChartData]]:
+    """
+    Store a single event in database and calculate its chart if time/location available.
+
+    The batch pipeline in main() uses the row builders directly; this wrapper is
+    kept for single-event callers (e.g. the on-demand notification job).
+
     Args:
         event: Event dictionary with all required fields
-    
+
     Returns:
         Tuple of (event_id, chart_data) if successful, (None, None) otherwise
     """
     try:
-        # Extract astrological relevance if available (from prompt system)
-        astro_relevance = event.get('astrological_relevance', {})
-        astrological_metadata = None
-        if astro_relevance:
-            astrological_metadata = {
-                'primary_houses': astro_relevance.get('primary_houses', []),
-                'primary_planets': astro_relevance.get('primary_planets', []),
-                'keywords': astro_relevance.get('keywords', []),
-                'reasoning': astro_relevance.get('reasoning', '')
-            }
-        
-        # Extract impact_metrics (from prompt system)
-        impact_metrics = event.get('impact_metrics', {})
-        
-        # Extract sources (from prompt system)
-        sources = event.get('sources', [])
-        if not isinstance(sources, list):
-            sources = []
-        
-        # Normalize timezone before storing
-        raw_timezone = event.get('timezone') or 'UTC'
-        normalized_timezone = normalize_timezone(
-            raw_timezone,
-            latitude=event.get('latitude'),
-            longitude=event.get('longitude')
-        )
-        
-        # Prepare event data for events table (matching import_automated_events.py structure)
-        event_data = {
-            "date": event.get('date'),
-            "title": event.get('title'),
-            "description": event.get('description', ''),
-            "category": event.get('category', 'Other'),
-            "location": event.get('location', ''),
-            "latitude": event.get('latitude'),
-            "longitude": event.get('longitude'),
-            "impact_level": event.get('impact_level', 'medium'),
-            "event_type": 'world',
-            "tags": event.get('tags', []),
-            # Enhanced time fields (with normalized timezone)
-            "event_time": event.get('time') if event.get('time') and event.get('time') != 'estimated' else None,
-            "timezone": normalized_timezone,  # Use normalized timezone
-            "has_accurate_time": event.get('time') is not None and event.get('time') != 'estimated',
-            # Enhanced astrological metadata fields (from prompt system)
-            "astrological_metadata": astrological_metadata,
-            "impact_metrics": impact_metrics if impact_metrics else None,
-            "research_score": event.get('research_score'),
-            "sources": sources  # Store source URLs
-        }
-        
-        print(f"    📝 Attempting to store: {event_data.get('title', 'Unknown')}")
-        print(f"       Date: {event_data.get('date')}, Location: {event_data.get('location')}")
-        
-        # Insert into events table
-        result = supabase.table('events').insert(event_data).execute()
-        
-        if not result.data or len(result.data) == 0:
+        resolve_event_location(event)
+        event_row = build_event_row(event)
+
+        print(f"    📝 Attempting to store: {event_row.get('title', 'Unknown')}")
+        print(f"       Date: {event_row.get('date')}, Location: {event_row.get('location')}")
+
+        inserted = insert_rows(supabase, 'events', [event_row])[0]
+        if not inserted:
             print(f"    ✗ Database insert returned no data")
-            if hasattr(result, 'error') and result.error:
-                print(f"    ✗ Database error: {result.error}")
             return None, None
-        
-        event_id = result.data[0]['id']
-        
-        # Try to get coordinates if missing
-        event_lat = event.get('latitude')
-        event_lng = event.get('longitude')
-        coordinates_updated = False
-        
-        if (event_lat is None or event_lng is None) and event.get('location'):
-            print(f"    🔍 Geocoding location: {event.get('location')}")
-            try:
-                if GEOCODING_AVAILABLE:
-                    geolocator = Nominatim(user_agent="cosmic-diary/1.0", timeout=10)
-                    location_obj = geolocator.geocode(event.get('location'))
-                    if location_obj:
-                        event_lat = location_obj.latitude
-                        event_lng = location_obj.longitude
-                        print(f"    ✓ Geocoded: {event_lat:.4f}, {event_lng:.4f}")
-                        coordinates_updated = True
-                    else:
-                        print(f"    ⚠️  Could not geocode location")
-            except (GeocoderTimedOut, GeocoderServiceError, Exception) as e:
-                print(f"    ⚠️  Geocoding error: {e}")
-        
-        # Use default coordinates for India if still missing and location mentions India
-        if (event_lat is None or event_lng is None) and event.get('location', '').lower().find('india') != -1:
-            print(f"    📍 Using default India coordinates (Delhi)")
-            event_lat = 28.6139  # Delhi
-            event_lng = 77.2090
-            coordinates_updated = True
-        
-        # Update event in database with geocoded coordinates if we got them
-        if coordinates_updated and event_lat is not None and event_lng is not None:
-            try:
-                update_result = supabase.table('events').update({
-                    'latitude': event_lat,
-                    'longitude': event_lng
-                }).eq('id', event_id).execute()
-                
-                if update_result.data:
-                    print(f"    ✓ Updated event with coordinates: {event_lat:.4f}, {event_lng:.4f}")
-                else:
-                    print(f"    ⚠️  Could not update event coordinates in database")
-            except Exception as e:
-                print(f"    ⚠️  Error updating event coordinates: {e}")
-        
-        # Calculate and store chart if time and coordinates available
-        # Check for both 'time' (from OpenAI) and 'event_time' (already converted)
-        event_time_str = event.get('event_time') or event.get('time')
-        
-        if (event_time_str and 
-            event_lat is not None and 
-            event_lng is not None):
-            
-            try:
-                # Parse date and time
-                event_date = datetime.strptime(event['date'], '%Y-%m-%d').date()
-                time_parts = event_time_str.split(':')
-                event_time_obj = time(
-                    int(time_parts[0]),
-                    int(time_parts[1]) if len(time_parts) > 1 else 0,
-                    int(time_parts[2]) if len(time_parts) > 2 else 0
-                )
-                
-                # Normalize timezone (convert UTC+5:30 to Asia/Kolkata, etc.)
-                # Get timezone from stored event data (already normalized) or raw event
-                stored_timezone = result.data[0].get('timezone') if result.data else None
-                raw_timezone = event.get('timezone') or stored_timezone or 'UTC'
-                timezone_str = normalize_timezone(
-                    raw_timezone, 
-                    latitude=event_lat, 
-                    longitude=event_lng
-                )
-                if raw_timezone != timezone_str and raw_timezone != stored_timezone:
-                    print(f"    🔄 Normalized timezone: {raw_timezone} → {timezone_str}")
-                    
-                    # Update timezone in database
-                    try:
-                        supabase.table('events').update({'timezone': timezone_str}).eq('id', event_id).execute()
-                    except Exception as e:
-                        print(f"    ⚠️  Could not update timezone: {e}")
-                
-                # Calculate chart
-                chart_data = calculate_complete_chart(
-                    event_date=event_date,
-                    event_time=event_time_obj,
-                    latitude=event_lat,
-                    longitude=event_lng,
-                    timezone_str=timezone_str
-                )
-                
-                # Prepare chart data for database
-                chart_db_data = {
-                    "event_id": event_id,
-                    "ascendant_degree": chart_data.get('ascendant_degree', 0.0),
-                    "ascendant_rasi": chart_data.get('ascendant_rasi', ''),
-                    "ascendant_rasi_number": chart_data.get('ascendant_rasi_number', 1),
-                    "ascendant_nakshatra": chart_data.get('ascendant_nakshatra'),
-                    "ascendant_lord": chart_data.get('ascendant_lord', ''),
-                    "house_cusps": chart_data.get('house_cusps', []),
-                    "house_system": chart_data.get('house_system', 'Placidus'),
-                    "julian_day": chart_data.get('julian_day', 0.0),
-                    "sidereal_time": chart_data.get('sidereal_time'),
-                    "ayanamsa": chart_data.get('ayanamsa', 0.0),
-                    "planetary_positions": chart_data.get('planetary_positions', {}),
-                    "planetary_strengths": chart_data.get('planetary_strengths')
-                }
-                
-                # Insert into event_chart_data table
-                chart_insert_result = supabase.table('event_chart_data').insert(chart_db_data).execute()
-                if chart_insert_result.data and len(chart_insert_result.data) > 0:
-                    print(f"    ✓ Chart data stored for event {event_id}")
-                else:
-                    print(f"    ⚠️  Chart data insert returned no data (may already exist)")
-                
-                return event_id, chart_data
-            
-            except Exception as e:
-                print(f"    ⚠️  Could not calculate chart: {e}")
-                return event_id, None
-        
-        return event_id, None
-    
+
+        event_id = inserted['id']
+        chart_data = compute_event_chart(event)
+        if not chart_data:
+            return event_id, None
+
+        if insert_rows(supabase, 'event_chart_data', [build_chart_row(event_id, chart_data)])[0]:
+            print(f"    ✓ Chart data stored for event {event_id}")
+        else:
+            print(f"    ⚠️  Chart data insert returned no data (may already exist)")
+
+        return event_id, chart_data
+
     except Exception as e:
         print(f"    ✗ Error storing event: {e}")
         return None, None
@@ -1043,143 +1385,54 @@ def store_event_with_chart(event: Dict[str, Any]) -> Tuple[Optional[int], Option
 
 def correlate_and_store(
     event_id: int,
-    event_chart: Dict[str, Any],
+    event_chart: Mapping[str, Any],
     snapshot_id: int,
-    snapshot_chart: Dict[str, Any]
-) -> bool:
+    snapshot_chart: Mapping[str, Any],
+    event_date: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """
-    Correlate event with snapshot and store results.
+    Correlate a single event with snapshot and store results.
 
     Args:
         event_id: Database ID of the event
         event_chart: Event chart data dictionary
         snapshot_id: Database ID of the snapshot
         snapshot_chart: Snapshot chart data dictionary
+        event_date: Event date (YYYY-MM-DD); fetched from the database if omitted
 
     Returns:
-        True if successful, False otherwise
+        The event_cosmic_correlations row (with correlation_score and
+        total_matches) if successful, None otherwise
     """
     try:
-        # Correlate event with snapshot
-        correlation_data = correlate_event_with_snapshot(
-            event_chart=event_chart,
-            snapshot_chart=snapshot_chart,
-            snapshot_id=snapshot_id
-        )
-
-        # Prepare correlation data for database
-        correlation_db_data = {
-            "event_id": event_id,
-            "snapshot_id": snapshot_id,
-            "correlation_score": correlation_data.get('correlation_score', 0.0),
-            "matching_factors": correlation_data.get('correlations', []),
-            "total_matches": correlation_data.get('total_matches', 0)
-        }
+        if event_date is None:
+            try:
+                event_data = supabase.table('events').select('date').eq('id', event_id).single().execute()
+                event_date = event_data.data.get('date') if event_data.data else None
+            except Exception:
+                event_date = None
 
-        # Insert into event_cosmic_correlations table (for analysis)
-        correlation_insert_result = supabase.table('event_cosmic_correlations').insert(correlation_db_data).execute()
+        correlation_row, planetary_rows = build_correlation_rows(
+            event_id, event_date, event_chart, snapshot_id, snapshot_chart
+        )
 
-        if correlation_insert_result.data and len(correlation_insert_result.data) > 0:
-            print(f"    ✓ Cosmic correlation stored (Score: {correlation_db_data['correlation_score']:.2f}, Matches: {correlation_db_data['total_matches']})")
+        if insert_rows(supabase, 'event_cosmic_correlations', [correlation_row])[0]:
+            print(f"    ✓ Cosmic correlation stored (Score: {correlation_row['correlation_score']:.2f}, Matches: {correlation_row['total_matches']})")
         else:
             print(f"    ✗ Cosmic correlation insert returned no data")
-            if hasattr(correlation_insert_result, 'error') and correlation_insert_result.error:
-                print(f"    ✗ Database error: {correlation_insert_result.error}")
 
-        # ALSO insert into event_planetary_correlations (for Next.js app compatibility)
-        # Extract planet-specific correlations from the correlation data
-        planetary_correlations_stored = 0
-        correlations_list = correlation_data.get('correlations', [])
+        planetary_stored = sum(1 for row in insert_rows(supabase, 'event_planetary_correlations', planetary_rows) if row)
+        if planetary_stored > 0:
+            print(f"    ✓ {planetary_stored} planetary correlations stored for Next.js app")
 
-        # Get event date from chart or fetch from database
-        try:
-            event_data = supabase.table('events').select('date').eq('id', event_id).single().execute()
-            event_date = event_data.data.get('date') if event_data.data else None
-        except:
-            event_date = None
-
-        # Extract planetary positions from event chart
-        planetary_positions = event_chart.get('planetary_positions', {})
-
-        # Create correlations for significant planets mentioned in correlations
-        for correlation in correlations_list:
-            corr_type = correlation.get('type', '')
-            description = correlation.get('description', '')
-            score = correlation.get('score', 0.0)
-
-            # Extract planet names from correlation descriptions
-            planets_to_store = []
-
-            if 'retrograde' in corr_type.lower():
-                # Extract retrograde planets
-                details = correlation.get('details', {})
-                matching_planets = details.get('matching_planets', [])
-                for planet in matching_planets:
-                    planets_to_store.append((planet, f"{planet} retrograde correlation", score))
-
-            elif 'house' in corr_type.lower():
-                # Extract house position matches
-                details = correlation.get('details', {})
-                matching_planets = details.get('matching_planets', [])
-                for match in matching_planets:
-                    planet = match.get('planet', '')
-                    house = match.get('house', '')
-                    if planet:
-                        planets_to_store.append((planet, f"{planet} in house {house}", score))
-
-            elif 'rasi' in corr_type.lower():
-                # Extract rasi matches
-                details = correlation.get('details', {})
-                matching_planets = details.get('matching_planets', [])
-                for match in matching_planets:
-                    planet = match.get('planet', '')
-                    rasi = match.get('rasi', '')
-                    if planet:
-                        planets_to_store.append((planet, f"{planet} in {rasi}", score))
-
-            elif 'aspect' in corr_type.lower():
-                # Extract aspect matches
-                details = correlation.get('details', {})
-                matching_aspects = details.get('matching_aspects', [])
-                for aspect in matching_aspects:
-                    planet1 = aspect.get('planet1', '')
-                    planet2 = aspect.get('planet2', '')
-                    aspect_type = aspect.get('type', '')
-                    if planet1:
-                        planets_to_store.append((planet1, f"{planet1} {aspect_type} {planet2}", score))
-
-            # Store each planet correlation
-            for planet_name, reason, planet_score in planets_to_store:
-                if planet_name and planet_name in planetary_positions:
-                    planet_data = planetary_positions[planet_name]
-
-                    planet_correlation = {
-                        "event_id": event_id,
-                        "date": event_date,
-                        "planet_name": planet_name,
-                        "planet_position": planet_data,
-                        "correlation_score": planet_score,
-                        "reason": reason
-                    }
-
-                    try:
-                        result = supabase.table('event_planetary_correlations').insert(planet_correlation).execute()
-                        if result.data:
-                            planetary_correlations_stored += 1
-                    except Exception as planet_err:
-                        # Don't fail the whole process if one planet correlation fails
-                        pass
-
-        if planetary_correlations_stored > 0:
-            print(f"    ✓ {planetary_correlations_stored} planetary correlations stored for Next.js app")
-
-        return True
+        return correlation_row
 
     except Exception as e:
         print(f"    ✗ Error correlating and storing: {e}")
         import traceback
+        flush_output()
         traceback.print_exc()
-        return False
+        return None
 
 
 def main():
@@ -1209,9 +1462,16 @@ def main():
         # Check environment variable
         lookback_hours = int(os.getenv('EVENT_LOOKBACK_HOURS', '2'))
     
-    print_header()
+    # Block-buffer stdout (a TTY defaults to line buffering); see flush_output()
+    sys.stdout.reconfigure(line_buffering=False)
+    
+    # Single timestamp for the whole run (header, snapshot, cutoffs)
+    run_time = datetime.now(timezone.utc)
+    
+    print_header(run_time)
     print(f"🔍 Event Detection Mode: {lookback_hours} hour(s) lookback")
     print("")
+    flush_output()
     
     snapshot_id = None
     snapshot_chart = None
@@ -1221,57 +1481,17 @@ def main():
     correlation_scores = []
     
     try:
-        # STEP 1: Capture Cosmic Snapshot
+        # STEP 1 + STEP 2: Capture Cosmic Snapshot and Detect Events concurrently
+        # (independent until STEP 3, so wallclock is max(snapshot, detection))
         print("")
-        print("Starting STEP 1...")
-        snapshot_id, snapshot_chart = capture_cosmic_snapshot()
+        print("Starting STEP 1 and STEP 2 concurrently...")
+        (snapshot_id, snapshot_chart), events_detected = asyncio.run(
+            capture_snapshot_and_detect_events(lookback_hours, run_time)
+        )
         print(f"✓ STEP 1 completed. Snapshot ID: {snapshot_id}")
+        print(f"✓ STEP 2 completed. Events detected: {len(events_detected)}")
         print("")
-        
-        # STEP 2: Detect Events with specified lookback window
-        print("Starting STEP 2...")
-        try:
-            # Try NewsAPI first (if key is available), then fall back to OpenAI
-            newsapi_key = os.getenv('NEWSAPI_KEY')
-
-            if newsapi_key:
-                print("🔄 Attempting NewsAPI integration first...")
-                newsapi_events = fetch_newsapi_events(lookback_hours=lookback_hours)
-
-                if len(newsapi_events) >= 5:
-                    print(f"✅ Using {len(newsapi_events)} events from NewsAPI")
-                    print("   (NewsAPI provides real-time news - better than OpenAI)")
-
-                    # Auto-map astrological relevance for NewsAPI events
-                    print("\n🔮 Auto-mapping astrological relevance for NewsAPI events...")
-                    for event in newsapi_events:
-                        if not event.get('astrological_relevance'):
-                            event['astrological_relevance'] = auto_map_event_to_astrology(event)
-                        # Calculate research score
-                        event['research_score'] = calculate_research_score(event)
-
-                    events_detected = newsapi_events
-                else:
-                    print(f"⚠️  NewsAPI returned only {len(newsapi_events)} events")
-                    print("   Falling back to OpenAI for better coverage...")
-                    events_detected = detect_events_openai(lookback_hours=lookback_hours)
-            else:
-                print("ℹ️  NEWSAPI_KEY not set, using OpenAI")
-                print("   Tip: Get a free NewsAPI key at https://newsapi.org/register for real-time news")
-                events_detected = detect_events_openai(lookback_hours=lookback_hours)
-
-            print(f"✓ STEP 2 completed. Events detected: {len(events_detected)}")
-        except Exception as step2_error:
-            print("")
-            print("=" * 80)
-            print("ERROR IN STEP 2: EVENT DETECTION")
-            print("=" * 80)
-            print(f"❌ Fatal error during event detection: {step2_error}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 80)
-            print("")
-            raise
+        flush_output()
         
         if not events_detected:
             print("⚠️  No events detected. Exiting.")
@@ -1290,13 +1510,25 @@ def main():
             print("::endgroup::")
             return
 
+        # Skip events already stored by a previous run (no DB round trip needed)
+        seen_events = load_seen_events()
+        if seen_events:
+            before_count = len(events_detected)
+            events_detected = [
+                e for e in events_detected
+                if (e.get('title'), e.get('date')) not in seen_events
+            ]
+            skipped = before_count - len(events_detected)
+            if skipped:
+                print(f"⏭️  Skipped {skipped} event(s) already stored in a previous run")
+
         # STEP 2b: APPLY QUALITY FILTERS
         print("")
         print("Starting STEP 2b: Applying Quality Filters...")
 
         # Fetch recent events from database for deduplication
         try:
-            cutoff_date = (datetime.now() - timedelta(hours=72)).strftime('%Y-%m-%d')
+            cutoff_date = (run_time - timedelta(hours=72)).strftime('%Y-%m-%d')
             existing_events_result = supabase.table('events')\
                 .select('id, title, date')\
                 .gte('date', cutoff_date)\
@@ -1324,6 +1556,7 @@ def main():
             print(f"⚠️  Error during filtering: {filter_error}")
             print("   Continuing with unfiltered events")
             import traceback
+            flush_output()
             traceback.print_exc()
 
         if not events_detected:
@@ -1341,48 +1574,87 @@ def main():
             print("::endgroup::")
             return
 
-        # STEP 3-4: Process Each Event
+        # STEP 3-4: Process Events (one bulk insert per table)
         print("STEP 3-4: PROCESSING EVENTS AND CORRELATIONS")
         print("-" * 80)
         
         for i, event in enumerate(events_detected, 1):
-            print(f"[{i}/{len(events_detected)}] Processing: {event.get('title', 'Unknown')}")
-            
-            # Store event with chart
-            result = store_event_with_chart(event)
-            if result is None:
-                print("  ✗ Failed to store event")
+            print(f"[{i}/{len(events_detected)}] Preparing: {event.get('title', 'Unknown')}")
+            resolve_event_location(event)
+        
+        print("")
+        print(f"💾 Storing {len(events_detected)} events...")
+        event_rows = [build_event_row(event) for event in events_detected]
+        inserted_events = insert_rows(supabase, 'events', event_rows)
+        
+        stored_events = []
+        for event, inserted in zip(events_detected, inserted_events):
+            if not inserted:
+                print(f"  ✗ Failed to store event: {event.get('title', 'Unknown')}")
                 continue
             
-            event_id, event_chart = result
             events_stored += 1
-            print(f"  ✓ Event stored (ID: {event_id})")
-            
-            # Correlate if chart was calculated
-            if event_chart:
-                success = correlate_and_store(
-                    event_id=event_id,
-                    event_chart=event_chart,
-                    snapshot_id=snapshot_id,
-                    snapshot_chart=snapshot_chart
-                )
-                
-                if success:
-                    correlations_created += 1
-                    # Get correlation score for summary
-                    correlation_result = correlate_event_with_snapshot(
-                        event_chart=event_chart,
-                        snapshot_chart=snapshot_chart,
-                        snapshot_id=snapshot_id
-                    )
-                    correlation_scores.append(correlation_result.get('correlation_score', 0.0))
-                    score = correlation_result.get('correlation_score', 0.0)
-                    matches = correlation_result.get('total_matches', 0)
-                    print(f"  ✓ Correlated (Score: {score:.2f}, Matches: {matches})")
+            seen_events.add((event.get('title'), event.get('date')))
+            stored_events.append((event, inserted['id']))
+            print(f"  ✓ Event stored (ID: {inserted['id']}): {event.get('title', 'Unknown')}")
+        
+        # Only events with an accurate time and coordinates get a chart/correlation;
+        # the rest are already stored and need no further work
+        chartable_events = [(event, event_id) for event, event_id in stored_events if is_chartable(event)]
+        print("")
+        print(f"🔮 Calculating charts for {len(chartable_events)} events "
+              f"({len(stored_events) - len(chartable_events)} without accurate time/location skipped)...")
+        event_charts = compute_event_charts([event for event, _ in chartable_events])
+        
+        chart_rows = []
+        correlation_rows = []
+        planetary_rows = []
+        # Same snapshot for every event, so its retrograde planets and aspects
+        # are extracted once
+        snapshot_retrograde_mask = get_retrograde_mask(snapshot_chart)
+        snapshot_aspects = get_chart_aspects(snapshot_chart)
+        
+        for (event, event_id), event_chart in zip(chartable_events, event_charts):
+            if not event_chart:
+                continue
             
-            print("")
+            chart_rows.append(build_chart_row(event_id, event_chart))
+            correlation_row, event_planetary_rows = build_correlation_rows(
+                event_id=event_id,
+                event_date=event.get('date'),
+                event_chart=event_chart,
+                snapshot_id=snapshot_id,
+                snapshot_chart=snapshot_chart,
+                snapshot_retrograde_mask=snapshot_retrograde_mask,
+                snapshot_aspects=snapshot_aspects
+            )
+            correlation_rows.append(correlation_row)
+            planetary_rows.extend(event_planetary_rows)
+            print(f"  ✓ Correlated event {event_id} (Score: {correlation_row['correlation_score']:.2f}, Matches: {correlation_row['total_matches']})")
+        
+        print("")
+        print(f"💾 Storing {len(chart_rows)} charts and {len(correlation_rows)} correlations...")
+        inserted_charts, inserted_correlations, inserted_planetary = asyncio.run(
+            insert_child_rows(chart_rows, correlation_rows, planetary_rows)
+        )
+        charts_stored = sum(1 for row in inserted_charts if row)
+        print(f"  ✓ Chart data stored: {charts_stored}/{len(chart_rows)}")
+        
+        for row, inserted in zip(correlation_rows, inserted_correlations):
+            if inserted:
+                correlations_created += 1
+                correlation_scores.append(row['correlation_score'])
+        print(f"  ✓ Cosmic correlations stored: {correlations_created}/{len(correlation_rows)}")
+        
+        planetary_stored = sum(1 for row in inserted_planetary if row)
+        if planetary_stored > 0:
+            print(f"  ✓ {planetary_stored} planetary correlations stored for Next.js app")
+        print("")
+        
+        save_seen_events(seen_events, run_time)
         
         # STEP 5: Summary
+        flush_output()
         print("=" * 80)
         print("SUMMARY")
         print("=" * 80)
@@ -1425,6 +1697,7 @@ def main():
         print(f"   Error type: {type(e).__name__}")
         import traceback
         print("\nFull traceback:")
+        flush_output()
         traceback.print_exc()
         print("=" * 80)
         print("")
@@ -9,11 +9,42 @@ Author: Cosmic Diary System
 Date: 2025-12-12
 """
 
-from typing import Dict, List, Tuple, Any, Optional
-from aspect_calculator import calculate_all_aspects
+import json
+import math
+from bisect import bisect_right
+from typing import Dict, List, Mapping, Tuple, Any, Optional
+from aspect_calculator import ASPECT_TARGETS, calculate_all_aspects
 
+# Planets compared for house and rasi matches
+PLANET_NAMES = ('Sun', 'Moon', 'Mars', 'Mercury', 'Jupiter', 'Venus', 'Saturn', 'Rahu', 'Ketu')
 
-def get_retrograde_planets(chart_data: Dict[str, Any]) -> List[str]:
+# One bit per planet for retrograde masks, in PLANET_NAMES order
+PLANET_BITS = {planet_name: 1 << index for index, planet_name in enumerate(PLANET_NAMES)}
+
+# Ordinal suffix by house number (index 0 unused), e.g. "1st", "2nd", "12th"
+HOUSE_ORDINAL_SUFFIXES = ('', 'st', 'nd', 'rd', 'th', 'th', 'th', 'th', 'th', 'th', 'th', 'th', 'th')
+
+# Match descriptions for every (planet, house) and (planet, target house, aspect
+# type) combination, built once at import
+HOUSE_MATCH_DESCRIPTIONS = {
+    (planet_name, house): f"{planet_name} in {house}{HOUSE_ORDINAL_SUFFIXES[house]} house in both charts"
+    for planet_name in PLANET_NAMES
+    for house in range(1, 13)
+}
+ASPECT_MATCH_DESCRIPTIONS = {
+    (planet_name, to_house, aspect_type): (
+        f"{planet_name} aspects {to_house}{HOUSE_ORDINAL_SUFFIXES[to_house]} house ({aspect_type}) in both charts"
+    )
+    for (planet_name, _), targets in ASPECT_TARGETS.items()
+    for to_house, aspect_type in targets
+}
+
+# Correlation strength categories: scores >= each threshold get the next label
+CORRELATION_STRENGTH_THRESHOLDS = (0.3, 0.5, 0.7)
+CORRELATION_STRENGTH_LABELS = ("Low", "Medium", "High", "Very High")
+
+
+def get_retrograde_planets(chart_data: Mapping[str, Any]) -> List[str]:
     """
     Extract list of retrograde planets from chart data.
     
@@ -52,6 +83,46 @@ def get_retrograde_planets(chart_data: Dict[str, Any]) -> List[str]:
     return retrograde_planets
 
 
+def get_retrograde_mask(chart_data: Mapping[str, Any]) -> int:
+    """
+    Get retrograde planets of a chart as a PLANET_BITS mask.
+    
+    When one chart is correlated against many others (e.g. every event of a run
+    against the same snapshot), compute its mask once and pass it to
+    correlate_event_with_snapshot(). Planets outside PLANET_NAMES are not
+    represented.
+    
+    Args:
+        chart_data: Chart dictionary with planetary_positions key
+    
+    Returns:
+        Bitmask with PLANET_BITS[planet] set for each retrograde planet
+    """
+    retrograde_mask = 0
+    for planet_name in get_retrograde_planets(chart_data):
+        retrograde_mask |= PLANET_BITS.get(planet_name, 0)
+    return retrograde_mask
+
+
+def get_chart_aspects(chart_data: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Get all aspects of a chart.
+    
+    When one chart is correlated against many others, compute its aspects once
+    and pass them to correlate_event_with_snapshot().
+    
+    Args:
+        chart_data: Chart dictionary with planetary_positions and house_cusps keys
+    
+    Returns:
+        List of aspect dictionaries from calculate_all_aspects()
+    """
+    return calculate_all_aspects(
+        chart_data.get('planetary_positions', {}),
+        chart_data.get('house_cusps', [])
+    )
+
+
 def get_planet_house(planet_data: Dict[str, Any]) -> Optional[int]:
     """
     Extract house number for a planet.
@@ -84,7 +155,7 @@ def get_planet_rasi(planet_data: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def extract_retrograde_planets(chart: Dict[str, Any]) -> List[str]:
+def extract_retrograde_planets(chart: Mapping[str, Any]) -> List[str]:
     """
     Extract list of all retrograde planets from a chart.
     
@@ -119,7 +190,7 @@ def extract_retrograde_planets(chart: Dict[str, Any]) -> List[str]:
     return get_retrograde_planets(chart)
 
 
-def extract_planet_houses(chart: Dict[str, Any]) -> Dict[str, int]:
+def extract_planet_houses(chart: Mapping[str, Any]) -> Dict[str, int]:
     """
     Extract house numbers for all planets from a chart.
     
@@ -164,7 +235,7 @@ def extract_planet_houses(chart: Dict[str, Any]) -> Dict[str, int]:
     return planet_houses
 
 
-def extract_planet_rasis(chart: Dict[str, Any]) -> Dict[str, str]:
+def extract_planet_rasis(chart: Mapping[str, Any]) -> Dict[str, str]:
     """
     Extract rasi (zodiac sign) names for all planets from a chart.
     
@@ -230,8 +301,7 @@ def calculate_correlation_score(correlations: List[Dict[str, Any]]) -> float:
         >>> calculate_correlation_score(correlations)
         0.45
     """
-    total_score = sum(corr.get('score', 0.0) for corr in correlations)
-    return min(total_score, 1.0)  # Cap at 1.0
+    return min(math.fsum([corr['score'] for corr in correlations]), 1.0)  # Cap at 1.0
 
 
 def categorize_correlation_strength(score: float) -> str:
@@ -250,17 +320,10 @@ def categorize_correlation_strength(score: float) -> str:
         >>> categorize_correlation_strength(0.45)
         'Medium'
     """
-    if score >= 0.7:
-        return "Very High"
-    elif score >= 0.5:
-        return "High"
-    elif score >= 0.3:
-        return "Medium"
-    else:
-        return "Low"
+    return CORRELATION_STRENGTH_LABELS[bisect_right(CORRELATION_STRENGTH_THRESHOLDS, score)]
 
 
-def validate_chart_structure(chart: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+def validate_chart_structure(chart: Mapping[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Validate that chart has required structure for correlation analysis.
     
@@ -288,9 +351,11 @@ def validate_chart_structure(chart: Dict[str, Any]) -> Tuple[bool, Optional[str]
 
 
 def correlate_event_with_snapshot(
-    event_chart: Dict[str, Any],
-    snapshot_chart: Dict[str, Any],
-    snapshot_id: int
+    event_chart: Mapping[str, Any],
+    snapshot_chart: Mapping[str, Any],
+    snapshot_id: int,
+    snapshot_retrograde_mask: Optional[int] = None,
+    snapshot_aspects: Optional[List[Dict[str, Any]]] = None
 ) -> Dict[str, Any]:
     """
     Analyze correlation between an event chart and a cosmic snapshot.
@@ -321,6 +386,9 @@ def correlate_event_with_snapshot(
         snapshot_chart: Cosmic snapshot chart data
             Format: Same as event_chart
         snapshot_id: ID of the snapshot being compared
+        snapshot_retrograde_mask: get_retrograde_mask(snapshot_chart), when the
+            caller correlates many events against the same snapshot
+        snapshot_aspects: get_chart_aspects(snapshot_chart), likewise
     
     Returns:
         Dictionary containing correlation analysis:
@@ -406,12 +474,13 @@ def correlate_event_with_snapshot(
     # -------------------------------------------------------------------------
     # b) RETROGRADE PLANET MATCHES (Score: 0.1 per planet - High)
     # -------------------------------------------------------------------------
-    event_retrograde = get_retrograde_planets(event_chart)
-    snapshot_retrograde = get_retrograde_planets(snapshot_chart)
+    if snapshot_retrograde_mask is None:
+        snapshot_retrograde_mask = get_retrograde_mask(snapshot_chart)
+    matching_retrograde = get_retrograde_mask(event_chart) & snapshot_retrograde_mask
     
-    matching_retrograde = set(event_retrograde) & set(snapshot_retrograde)
-    
-    for planet in matching_retrograde:
+    for planet, planet_bit in PLANET_BITS.items():
+        if not matching_retrograde & planet_bit:
+            continue
         correlations.append({
             "type": "retrograde_match",
             "description": f"{planet} retrograde in both charts",
@@ -426,14 +495,21 @@ def correlate_event_with_snapshot(
     
     # -------------------------------------------------------------------------
     # c) HOUSE POSITION MATCHES (Score: 0.05 per planet - Medium)
+    # e) RASI MATCHES (Score: 0.05 per planet - Medium)
+    #
+    # One pass over the planets: a rasi match only counts when the planet has
+    # no house match (avoid double counting). Rasi matches are appended after
+    # the aspect matches to keep the established correlation order.
     # -------------------------------------------------------------------------
-    planet_names = ['Sun', 'Moon', 'Mars', 'Mercury', 'Jupiter', 'Venus', 'Saturn', 'Rahu', 'Ketu']
+    rasi_correlations = []
     
-    for planet_name in planet_names:
-        event_planet = event_positions.get(planet_name, {})
-        snapshot_planet = snapshot_positions.get(planet_name, {})
-        
-        if not event_planet or not snapshot_planet:
+    for planet_name in PLANET_NAMES:
+        # One lookup per chart per planet; no throwaway {} default per call
+        event_planet = event_positions.get(planet_name)
+        if not event_planet:
+            continue
+        snapshot_planet = snapshot_positions.get(planet_name)
+        if not snapshot_planet:
             continue
         
         event_house = get_planet_house(event_planet)
@@ -442,7 +518,7 @@ def correlate_event_with_snapshot(
         if event_house and snapshot_house and event_house == snapshot_house:
             correlations.append({
                 "type": "planetary_house_match",
-                "description": f"{planet_name} in {event_house}{'st' if event_house == 1 else 'nd' if event_house == 2 else 'rd' if event_house == 3 else 'th'} house in both charts",
+                "description": HOUSE_MATCH_DESCRIPTIONS[(planet_name, event_house)],
                 "significance": "Medium",
                 "score": 0.05,
                 "details": {
@@ -452,83 +528,68 @@ def correlate_event_with_snapshot(
                     "snapshot_house": snapshot_house
                 }
             })
+            continue
+        
+        event_rasi = get_planet_rasi(event_planet)
+        snapshot_rasi = get_planet_rasi(snapshot_planet)
+        
+        if event_rasi and snapshot_rasi and event_rasi == snapshot_rasi:
+            rasi_correlations.append({
+                "type": "planetary_rasi_match",
+                "description": f"{planet_name} in {event_rasi} in both charts",
+                "significance": "Medium",
+                "score": 0.05,
+                "details": {
+                    "planet": planet_name,
+                    "rasi": event_rasi,
+                    "event_rasi": event_rasi,
+                    "snapshot_rasi": snapshot_rasi
+                }
+            })
     
     # -------------------------------------------------------------------------
     # d) ASPECT MATCHES (Score: 0.15 per aspect - High)
     # -------------------------------------------------------------------------
     try:
-        # Get house cusps for aspect calculation
-        event_house_cusps = event_chart.get('house_cusps', [])
-        snapshot_house_cusps = snapshot_chart.get('house_cusps', [])
+        # Calculate aspects for both charts (snapshot aspects may be precomputed)
+        event_aspects = get_chart_aspects(event_chart)
+        if snapshot_aspects is None:
+            snapshot_aspects = get_chart_aspects(snapshot_chart)
         
-        # Calculate aspects for both charts
-        event_aspects = calculate_all_aspects(event_positions, event_house_cusps)
-        snapshot_aspects = calculate_all_aspects(snapshot_positions, snapshot_house_cusps)
+        # Index snapshot aspects by (planet, target house, type); keep the first
+        # aspect for each key
+        snapshot_index: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+        for snapshot_aspect in snapshot_aspects:
+            match_key = (snapshot_aspect['planet'], snapshot_aspect['to_house'], snapshot_aspect['aspect_type'])
+            snapshot_index.setdefault(match_key, snapshot_aspect)
         
         # Find matching aspects (same planet, same target house, same type)
-        aspect_matches = []
+        aspect_matches = set()
         for event_aspect in event_aspects:
-            for snapshot_aspect in snapshot_aspects:
-                if (event_aspect['planet'] == snapshot_aspect['planet'] and
-                    event_aspect['to_house'] == snapshot_aspect['to_house'] and
-                    event_aspect['aspect_type'] == snapshot_aspect['aspect_type']):
-                    
-                    # Check if we already added this match
-                    match_key = (event_aspect['planet'], event_aspect['to_house'], event_aspect['aspect_type'])
-                    if match_key not in aspect_matches:
-                        aspect_matches.append(match_key)
-                        
-                        correlations.append({
-                            "type": "aspect_match",
-                            "description": f"{event_aspect['planet']} aspects {event_aspect['to_house']}{'st' if event_aspect['to_house'] == 1 else 'nd' if event_aspect['to_house'] == 2 else 'rd' if event_aspect['to_house'] == 3 else 'th'} house ({event_aspect['aspect_type']}) in both charts",
-                            "significance": "High",
-                            "score": 0.15,
-                            "details": {
-                                "planet": event_aspect['planet'],
-                                "aspect_type": event_aspect['aspect_type'],
-                                "target_house": event_aspect['to_house'],
-                                "event_aspect": event_aspect,
-                                "snapshot_aspect": snapshot_aspect
-                            }
-                        })
-    except Exception as e:
-        # If aspect calculation fails, skip aspect matching
+            match_key = (event_aspect['planet'], event_aspect['to_house'], event_aspect['aspect_type'])
+            matched_aspect = snapshot_index.get(match_key)
+            if matched_aspect is None or match_key in aspect_matches:
+                continue
+            aspect_matches.add(match_key)
+            
+            correlations.append({
+                "type": "aspect_match",
+                "description": ASPECT_MATCH_DESCRIPTIONS[match_key],
+                "significance": "High",
+                "score": 0.15,
+                "details": {
+                    "planet": event_aspect['planet'],
+                    "aspect_type": event_aspect['aspect_type'],
+                    "target_house": event_aspect['to_house'],
+                    "event_aspect": event_aspect,
+                    "snapshot_aspect": matched_aspect
+                }
+            })
+    except (KeyError, TypeError, ValueError):
+        # Malformed planet data (e.g. house outside 1-12): skip aspect matching
         pass
     
-    # -------------------------------------------------------------------------
-    # e) RASI MATCHES (Score: 0.05 per planet - Medium)
-    # -------------------------------------------------------------------------
-    for planet_name in planet_names:
-        event_planet = event_positions.get(planet_name, {})
-        snapshot_planet = snapshot_positions.get(planet_name, {})
-        
-        if not event_planet or not snapshot_planet:
-            continue
-        
-        event_rasi = get_planet_rasi(event_planet)
-        snapshot_rasi = get_planet_rasi(snapshot_planet)
-        
-        if event_rasi and snapshot_rasi and event_rasi == snapshot_rasi:
-            # Skip if we already matched this planet by house (avoid double counting)
-            house_match_exists = any(
-                corr.get('type') == 'planetary_house_match' and 
-                corr.get('details', {}).get('planet') == planet_name
-                for corr in correlations
-            )
-            
-            if not house_match_exists:
-                correlations.append({
-                    "type": "planetary_rasi_match",
-                    "description": f"{planet_name} in {event_rasi} in both charts",
-                    "significance": "Medium",
-                    "score": 0.05,
-                    "details": {
-                        "planet": planet_name,
-                        "rasi": event_rasi,
-                        "event_rasi": event_rasi,
-                        "snapshot_rasi": snapshot_rasi
-                    }
-                })
+    correlations.extend(rasi_correlations)
     
     # Calculate total correlation score
     correlation_score = calculate_correlation_score(correlations)
@@ -569,13 +630,15 @@ def format_correlation_report(correlation_data: Dict[str, Any]) -> str:
     total_matches = correlation_data.get('total_matches', 0)
     correlations = correlation_data.get('correlations', [])
     
-    # Group correlations by type
+    # Group correlations by type and by significance in one pass
+    # (correlations with any other significance only appear in the type summary)
     by_type = {}
+    by_significance: Dict[str, List[Dict[str, Any]]] = {sig: [] for sig in ("Very High", "High", "Medium", "Low")}
     for corr in correlations:
-        corr_type = corr.get('type', 'unknown')
-        if corr_type not in by_type:
-            by_type[corr_type] = []
-        by_type[corr_type].append(corr)
+        by_type.setdefault(corr.get('type', 'unknown'), []).append(corr)
+        sig_correlations = by_significance.get(corr.get('significance'))
+        if sig_correlations is not None:
+            sig_correlations.append(corr)
     
     # Build report
     report_lines = []
@@ -587,10 +650,8 @@ def format_correlation_report(correlation_data: Dict[str, Any]) -> str:
     report_lines.append(f"Total Matching Factors: {total_matches}")
     report_lines.append("")
     
-    # Group by significance
-    significance_order = ["Very High", "High", "Medium", "Low"]
-    for sig in significance_order:
-        sig_correlations = [c for c in correlations if c.get('significance') == sig]
+    # Sections by significance, highest first
+    for sig, sig_correlations in by_significance.items():
         if sig_correlations:
             report_lines.append(f"--- {sig} Significance ({len(sig_correlations)} matches) ---")
             for corr in sig_correlations:
@@ -679,6 +740,5 @@ if __name__ == "__main__":
     print("\n" + "=" * 80)
     print("JSON Structure:")
     print("=" * 80)
-    import json
     print(json.dumps(result, indent=2))
 
@@ -10,6 +10,8 @@ from datetime import date, datetime
 from pathlib import Path
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from supabase import create_client, Client
 
 # Get the directory where this script is located
@@ -33,13 +35,24 @@ SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_KEY
 # Flask API URL (if running separately)
 FLASK_API_URL = os.getenv('FLASK_API_URL', 'http://localhost:8000')
 
+# Shared HTTP session for the Flask API - keeps connections alive across dates
+# and retries transient gateway errors
+http_session = requests.Session()
+http_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+
 def calculate_planetary_data_via_api(target_date: date) -> dict:
     """Fetch planetary data from Flask API"""
     try:
         url = f"{FLASK_API_URL}/api/planets/daily"
         params = {'date': target_date.isoformat()}
         
-        response = requests.get(url, params=params, timeout=30)
+        response = http_session.get(url, params=params, timeout=30)
         response.raise_for_status()
         
         return response.json()
@@ -51,33 +64,18 @@ def calculate_planetary_data_via_api(target_date: date) -> dict:
 def store_planetary_data(supabase: Client, planetary_data: dict):
     """Store planetary data in Supabase"""
     try:
-        # Check if data already exists for this date
         date_str = planetary_data['date']
         
-        # Try to get existing record
-        existing = supabase.table('planetary_data')\
-            .select('id')\
-            .eq('date', date_str)\
-            .execute()
-        
         data_to_store = {
             'date': date_str,
             'planetary_data': planetary_data['planetary_data']
         }
         
-        if existing.data:
-            # Update existing record
-            result = supabase.table('planetary_data')\
-                .update(data_to_store)\
-                .eq('date', date_str)\
-                .execute()
-            print(f"✅ Updated planetary data for {date_str}")
-        else:
-            # Insert new record
-            result = supabase.table('planetary_data')\
-                .insert(data_to_store)\
-                .execute()
-            print(f"✅ Inserted planetary data for {date_str}")
+        # Single INSERT ... ON CONFLICT (date) DO UPDATE (date is UNIQUE)
+        supabase.table('planetary_data')\
+            .upsert(data_to_store, on_conflict='date')\
+            .execute()
+        print(f"✅ Stored planetary data for {date_str}")
         
         return True
     
@@ -0,0 +1,57 @@
+-- ============================================================================
+-- Migration 010: Create Weekly Event Stats Function
+-- ============================================================================
+-- 
+-- Description:
+--   Creates the cosmic_weekly_stats() function used by the weekly email report.
+--   It returns event counts per event_type, category and impact_level for a
+--   date range in a single GROUPING SETS query, so the report no longer has to
+--   download every event row just to count them.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- Purpose:
+--   - Aggregate weekly event statistics inside Postgres
+--   - Return one row per (dimension, value) instead of one row per event
+--   - Callable from Python via supabase.rpc('cosmic_weekly_stats', {...})
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the migration
+--   5. Verify with: SELECT * FROM cosmic_weekly_stats('2025-01-01', '2025-01-07');
+--
+-- Rollback (if needed):
+--   See: database_migrations/010_create_weekly_event_stats_function_rollback.sql
+--
+-- ============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION cosmic_weekly_stats(start_date DATE, end_date DATE)
+RETURNS TABLE (dimension TEXT, value TEXT, cnt BIGINT) AS $$
+    SELECT
+        CASE
+            WHEN GROUPING(e.event_type) = 0 THEN 'event_type'
+            WHEN GROUPING(e.category) = 0 THEN 'category'
+            ELSE 'impact_level'
+        END AS dimension,
+        -- Only the column of the active grouping set is non-NULL
+        COALESCE(e.event_type, e.category, e.impact_level) AS value,
+        COUNT(*) AS cnt
+    FROM events e
+    WHERE e.date BETWEEN start_date AND end_date
+    GROUP BY GROUPING SETS ((e.event_type), (e.category), (e.impact_level))
+    ORDER BY dimension, cnt DESC, value;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION cosmic_weekly_stats(DATE, DATE) IS 
+'Event counts per event_type, category and impact_level between start_date and end_date (inclusive). Used by email_reports.py for the weekly analysis report.';
+
+COMMIT;
+
+-- ============================================================================
+-- End of Migration
+-- ============================================================================
@@ -0,0 +1,29 @@
+-- ============================================================================
+-- Migration 010 Rollback: Drop Weekly Event Stats Function
+-- ============================================================================
+-- 
+-- Description:
+--   Rollback script for Migration 010. Drops the cosmic_weekly_stats()
+--   function. No data is affected - the weekly report falls back to
+--   counting events client-side.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the rollback
+--
+-- ============================================================================
+
+BEGIN;
+
+DROP FUNCTION IF EXISTS cosmic_weekly_stats(DATE, DATE);
+
+COMMIT;
+
+-- ============================================================================
+-- End of Rollback
+-- ============================================================================
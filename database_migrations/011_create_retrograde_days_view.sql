@@ -0,0 +1,48 @@
+-- ============================================================================
+-- Migration 011: Create Retrograde Days View
+-- ============================================================================
+-- 
+-- Description:
+--   Creates the retrograde_days view listing every date in planetary_data on
+--   which at least one planet is retrograde. The weekly email report reads
+--   this view instead of downloading the full planetary JSONB for each day
+--   just to derive a yes/no flag.
+--
+--   A plain view (not materialized) is used: planetary_data.date is UNIQUE
+--   and indexed, so a weekly range query only inspects ~7 rows and the view
+--   never needs refreshing when the daily job upserts new data.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the migration
+--   5. Verify with: SELECT * FROM retrograde_days ORDER BY date DESC LIMIT 10;
+--
+-- Rollback (if needed):
+--   See: database_migrations/011_create_retrograde_days_view_rollback.sql
+--
+-- ============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE VIEW retrograde_days AS
+SELECT pd.date
+FROM planetary_data pd
+WHERE EXISTS (
+    SELECT 1
+    FROM jsonb_array_elements(pd.planetary_data->'planets') AS p
+    WHERE (p->>'is_retrograde')::boolean
+);
+
+COMMENT ON VIEW retrograde_days IS 
+'Dates on which at least one planet is retrograde, derived from planetary_data. Used by email_reports.py for the weekly analysis report.';
+
+COMMIT;
+
+-- ============================================================================
+-- End of Migration
+-- ============================================================================
@@ -0,0 +1,29 @@
+-- ============================================================================
+-- Migration 011 Rollback: Drop Retrograde Days View
+-- ============================================================================
+-- 
+-- Description:
+--   Rollback script for Migration 011. Drops the retrograde_days view.
+--   No data is affected - the weekly report falls back to reading
+--   planetary_data directly.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the rollback
+--
+-- ============================================================================
+
+BEGIN;
+
+DROP VIEW IF EXISTS retrograde_days;
+
+COMMIT;
+
+-- ============================================================================
+-- End of Rollback
+-- ============================================================================
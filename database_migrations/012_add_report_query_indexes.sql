@@ -0,0 +1,57 @@
+-- ============================================================================
+-- Migration 012: Add Composite Indexes for Report Queries
+-- ============================================================================
+-- 
+-- Description:
+--   Adds composite indexes matching the queries issued by email_reports.py:
+--   - events filtered by a date range and split by event_type
+--   - event_planetary_correlations filtered by event_id and ordered by
+--     correlation_score DESC (top correlations per event)
+--
+--   planetary_data needs no new index: its date column is UNIQUE and is
+--   therefore already backed by a unique btree index.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the migration
+--   5. Verify the plans switch to index scans, e.g.:
+--        EXPLAIN ANALYZE SELECT event_id, planet_name, correlation_score, reason
+--        FROM event_planetary_correlations
+--        WHERE event_id IN (1, 2, 3) ORDER BY correlation_score DESC;
+--
+-- Rollback (if needed):
+--   See: database_migrations/012_add_report_query_indexes_rollback.sql
+--
+-- ============================================================================
+
+BEGIN;
+
+-- ----------------------------------------------------------------------------
+-- Indexes for Performance
+-- ----------------------------------------------------------------------------
+
+-- Composite index on date and event_type for ranged world/personal lookups
+CREATE INDEX IF NOT EXISTS idx_events_date_type 
+ON events(date, event_type);
+
+COMMENT ON INDEX idx_events_date_type IS 
+'Composite index on date and event_type for the daily/weekly report queries and cosmic_weekly_stats() grouping by event type over a date range.';
+
+-- Composite index on event_id and score for per-event top correlations
+-- (named to avoid clashing with idx_correlations_* on event_cosmic_correlations)
+CREATE INDEX IF NOT EXISTS idx_planetary_correlations_event_score 
+ON event_planetary_correlations(event_id, correlation_score DESC);
+
+COMMENT ON INDEX idx_planetary_correlations_event_score IS 
+'Composite index on event_id and correlation_score (DESC) so the daily report can fetch correlations for a set of events already ordered by score.';
+
+COMMIT;
+
+-- ============================================================================
+-- End of Migration
+-- ============================================================================
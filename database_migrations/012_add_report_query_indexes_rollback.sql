@@ -0,0 +1,29 @@
+-- ============================================================================
+-- Migration 012 Rollback: Drop Report Query Indexes
+-- ============================================================================
+-- 
+-- Description:
+--   Rollback script for Migration 012. Drops the composite indexes added for
+--   the email report queries. No data is affected.
+--
+-- Date Created: 2026-10-16
+-- Author: Cosmic Diary Migration System
+--
+-- How to Apply:
+--   1. Connect to your Supabase PostgreSQL database
+--   2. Open the SQL Editor in Supabase Dashboard
+--   3. Copy and paste this entire file
+--   4. Execute the rollback
+--
+-- ============================================================================
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_events_date_type;
+DROP INDEX IF EXISTS idx_planetary_correlations_event_score;
+
+COMMIT;
+
+-- ============================================================================
+-- End of Rollback
+-- ============================================================================
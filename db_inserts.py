@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Bulk Insert Helper
+
+Shared by the event collection scripts to insert many rows into a Supabase
+table with one request, without losing or duplicating rows when it fails.
+
+Author: Cosmic Diary System
+Date: 2026-10-16
+"""
+
+from typing import Any, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+from supabase import Client
+
+
+def _matches(row: Dict[str, Any], returned: Dict[str, Any]) -> bool:
+    """Check whether a returned row is the stored copy of an input row (text columns only)."""
+    return all(
+        returned.get(column) == value
+        for column, value in row.items()
+        if isinstance(value, str)
+    )
+
+
+def align_returned_rows(
+    rows: List[Dict[str, Any]],
+    returned: List[Dict[str, Any]]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Align the rows PostgREST returned with the rows that were sent.
+
+    PostgREST returns inserted rows in input order, so when fewer rows come back
+    each returned row is matched to the next input row with the same text values.
+
+    Args:
+        rows: Row dictionaries that were inserted
+        returned: Rows returned by the insert
+
+    Returns:
+        Returned rows aligned with the input; None where no row came back
+    """
+    if len(returned) == len(rows):
+        return list(returned)
+
+    aligned: List[Optional[Dict[str, Any]]] = []
+    remaining = iter(returned)
+    pending = next(remaining, None)
+    for row in rows:
+        if pending is not None and _matches(row, pending):
+            aligned.append(pending)
+            pending = next(remaining, None)
+        else:
+            aligned.append(None)
+    return aligned
+
+
+def insert_rows(client: Client, table: str, rows: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Insert rows into a table with a single bulk request.
+
+    If PostgREST rejects the statement (APIError: one bad row fails the whole
+    insert, so nothing was stored), rows are retried individually so one failure
+    doesn't drop the batch. Any other error (network, timeout) leaves the outcome
+    unknown - the insert may have committed - so rows are not retried, to avoid
+    storing them twice.
+
+    Args:
+        client: Supabase client
+        table: Table name
+        rows: Row dictionaries to insert
+
+    Returns:
+        Inserted rows aligned with the input; None where a row was not stored
+        (or its outcome is unknown)
+    """
+    if not rows:
+        return []
+
+    try:
+        result = client.table(table).insert(rows).execute()
+        returned = result.data or []
+        if len(returned) != len(rows):
+            print(f"    ⚠️  Bulk insert into {table} returned {len(returned)}/{len(rows)} rows")
+        return align_returned_rows(rows, returned)
+    except APIError as e:
+        print(f"    ⚠️  Bulk insert into {table} rejected: {e}")
+        print(f"       Retrying {len(rows)} row(s) individually...")
+    except Exception as e:
+        print(f"    ⚠️  Bulk insert into {table} failed with unknown outcome: {e}")
+        print(f"       Not retrying {len(rows)} row(s) to avoid duplicates")
+        return [None] * len(rows)
+
+    inserted: List[Optional[Dict[str, Any]]] = []
+    for row in rows:
+        try:
+            result = client.table(table).insert(row).execute()
+            inserted.append(result.data[0] if result.data else None)
+        except APIError as e:
+            print(f"    ✗ Insert into {table} rejected: {e}")
+            inserted.append(None)
+        except Exception as e:
+            print(f"    ✗ Insert into {table} failed with unknown outcome: {e}")
+            inserted.append(None)
+    return inserted
@@ -2,16 +2,87 @@
 """
 Diagnostic script to test GitHub Actions environment.
 Run this in GitHub Actions to diagnose why events are not being collected.
+
+Set DIAG_MODE=quick to check only environment, files and packages (no API calls);
+the default, DIAG_MODE=full, also tests the OpenAI and Supabase connections.
 """
+import importlib.metadata
+import io
+import json
 import os
 import sys
-from pathlib import Path
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Section rule and the framed title banner
+SECTION_RULE = "=" * 80
+BANNER_TITLE = "GITHUB ACTIONS DIAGNOSTIC TOOL"
+BANNER = f"╔{'=' * 78}╗\n║{BANNER_TITLE.center(78)}║\n╚{'=' * 78}╝"
+
+def mask_value(value):
+    """Show only the first 10 characters of a secret."""
+    return value[:10] + "..." if len(value) > 10 else value
+
+class ThreadOutputRouter(io.TextIOBase):
+    """
+    Stand-in for sys.stdout that sends each thread's output to its own buffer.
+
+    Threads that called start_capture() write to a private StringIO; all other
+    threads write straight through to the original stream. This lets checks run
+    concurrently while their output is still printed one section at a time.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def start_capture(self):
+        self.local.buffer = io.StringIO()
+
+    def stop_capture(self):
+        buffer = self.local.buffer
+        del self.local.buffer
+        return buffer.getvalue()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def run_captured(router, check):
+    """Run a check on a worker thread; return (result, captured output)."""
+    router.start_capture()
+    try:
+        result = check()
+    finally:
+        output = router.stop_capture()
+    return result, output
+
+def send_probe(url, headers, payload=None, timeout=15):
+    """
+    Send one small HTTP request with urllib (no SDK import needed).
+
+    Returns (status, parsed JSON body); raises urllib.error.HTTPError on 4xx/5xx.
+    """
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status, json.loads(response.read() or b'null')
+
+def describe_http_error(error):
+    """Status plus the start of the error body (OpenAI/PostgREST explain the failure there)."""
+    body = error.read().decode('utf-8', errors='replace')
+    return f"HTTP {error.code}: {body[:300]}"
 
 def check_environment():
     """Check all required environment variables."""
-    print("=" * 80)
+    print(SECTION_RULE)
     print("ENVIRONMENT VARIABLE CHECK")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     required_vars = {
@@ -25,40 +96,31 @@ def check_environment():
         'EVENT_LOOKBACK_HOURS': 'Optional - defaults to 2 hours',
     }
 
-    all_good = True
-
-    print("Required Variables:")
-    for var, description in required_vars.items():
-        value = os.getenv(var)
-        if value:
-            # Show first 10 chars only for security
-            masked = value[:10] + "..." if len(value) > 10 else value
-            print(f"  ✅ {var}: SET ({masked})")
+    env = os.environ.copy()  # Read the environment once for both sections
+
+    for heading, variables, required in (
+        ("Required Variables:", required_vars, True),
+        ("Optional Variables:", optional_vars, False),
+    ):
+        print(heading)
+        for var, description in variables.items():
+            value = env.get(var)
+            if value:
+                print(f"  ✅ {var}: SET ({mask_value(value)})")
+            elif required:
+                print(f"  ❌ {var}: NOT SET")
+            else:
+                print(f"  ℹ️  {var}: NOT SET (using default)")
             print(f"      {description}")
-        else:
-            print(f"  ❌ {var}: NOT SET")
-            print(f"      {description}")
-            all_good = False
-
-    print("")
-    print("Optional Variables:")
-    for var, description in optional_vars.items():
-        value = os.getenv(var)
-        if value:
-            masked = value[:10] + "..." if len(value) > 10 else value
-            print(f"  ✅ {var}: SET ({masked})")
-        else:
-            print(f"  ℹ️  {var}: NOT SET (using default)")
-        print(f"      {description}")
+        print("")
 
-    print("")
-    return all_good
+    return all(env.get(var) for var in required_vars)
 
 def check_files():
     """Check that required files exist."""
-    print("=" * 80)
+    print(SECTION_RULE)
     print("FILE SYSTEM CHECK")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     required_files = [
@@ -71,22 +133,23 @@ def check_files():
     all_good = True
 
     for file_path in required_files:
-        path = Path(file_path)
-        if path.exists():
-            size = path.stat().st_size
-            print(f"  ✅ {file_path} ({size:,} bytes)")
-        else:
+        # One stat call both checks existence and gets the size
+        try:
+            size = os.stat(file_path).st_size
+        except FileNotFoundError:
             print(f"  ❌ {file_path} NOT FOUND")
             all_good = False
+        else:
+            print(f"  ✅ {file_path} ({size:,} bytes)")
 
     print("")
     return all_good
 
 def check_python_packages():
     """Check that required Python packages are installed."""
-    print("=" * 80)
+    print(SECTION_RULE)
     print("PYTHON PACKAGE CHECK")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     packages = {
@@ -99,18 +162,21 @@ def check_python_packages():
 
     all_good = True
 
+    # Map import names to their distributions (e.g. swisseph -> pyswisseph) in
+    # one metadata sweep and read versions from metadata, without importing
+    # any package (the SDK imports are the slowest part of this script)
+    import_to_distributions = importlib.metadata.packages_distributions()
+
     for package, description in packages.items():
-        try:
-            __import__(package)
-            # Get version if possible
+        distributions = import_to_distributions.get(package)
+        if distributions:
             try:
-                mod = __import__(package)
-                version = getattr(mod, '__version__', 'unknown')
-                print(f"  ✅ {package} (v{version})")
-            except:
-                print(f"  ✅ {package}")
+                version = importlib.metadata.version(distributions[0])
+            except importlib.metadata.PackageNotFoundError:
+                version = 'unknown'
+            print(f"  ✅ {package} (v{version})")
             print(f"      {description}")
-        except ImportError:
+        else:
             print(f"  ❌ {package} NOT INSTALLED")
             print(f"      {description}")
             all_good = False
@@ -120,9 +186,9 @@ def check_python_packages():
 
 def test_openai_connection():
     """Test OpenAI API connection."""
-    print("=" * 80)
+    print(SECTION_RULE)
     print("OPENAI API CONNECTION TEST")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     api_key = os.getenv('OPENAI_API_KEY')
@@ -132,21 +198,24 @@ def test_openai_connection():
         return False
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-
         print("  🔄 Testing OpenAI API connection...")
 
-        # Simple test call
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": "Say 'API test successful' if you can read this."}],
-            max_tokens=10
+        # Tiny completion on the collector's model: unlike listing models, this
+        # also catches model access and quota/billing problems
+        _, response = send_probe(
+            'https://api.openai.com/v1/chat/completions',
+            headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
+            payload={
+                'model': 'gpt-4o-mini',
+                'messages': [{'role': 'user', 'content': "Say 'API test successful' if you can read this."}],
+                'max_tokens': 10,
+            }
         )
 
-        if response.choices and len(response.choices) > 0:
+        choices = (response or {}).get('choices') or []
+        if choices:
             print(f"  ✅ OpenAI API connection successful")
-            print(f"      Response: {response.choices[0].message.content}")
+            print(f"      Response: {choices[0]['message']['content']}")
             print("")
             return True
         else:
@@ -154,6 +223,10 @@ def test_openai_connection():
             print("")
             return False
 
+    except urllib.error.HTTPError as e:
+        print(f"  ❌ OpenAI API connection failed: {describe_http_error(e)}")
+        print("")
+        return False
     except Exception as e:
         print(f"  ❌ OpenAI API connection failed: {e}")
         print(f"      Error type: {type(e).__name__}")
@@ -162,9 +235,9 @@ def test_openai_connection():
 
 def test_supabase_connection():
     """Test Supabase database connection."""
-    print("=" * 80)
+    print(SECTION_RULE)
     print("SUPABASE CONNECTION TEST")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     url = os.getenv('SUPABASE_URL')
@@ -176,54 +249,93 @@ def test_supabase_connection():
         return False
 
     try:
-        from supabase import create_client
-
         print(f"  🔄 Connecting to: {url}")
-        supabase = create_client(url, key)
 
-        # Test query
-        result = supabase.table('events').select('id').limit(1).execute()
+        # Same test query the Supabase client would send, straight to PostgREST
+        send_probe(
+            f"{url.rstrip('/')}/rest/v1/events?select=id&limit=1",
+            headers={'apikey': key, 'Authorization': f'Bearer {key}'}
+        )
 
         print(f"  ✅ Supabase connection successful")
         print(f"      Database is accessible")
         print("")
         return True
 
+    except urllib.error.HTTPError as e:
+        print(f"  ❌ Supabase connection failed: {describe_http_error(e)}")
+        print("")
+        return False
     except Exception as e:
         print(f"  ❌ Supabase connection failed: {e}")
         print(f"      Error type: {type(e).__name__}")
         print("")
         return False
 
+# Network checks and the environment variables each one needs
+NETWORK_CHECKS = (
+    ('OpenAI API', test_openai_connection, ('OPENAI_API_KEY',)),
+    ('Supabase Database', test_supabase_connection, ('SUPABASE_URL', 'SUPABASE_SERVICE_ROLE_KEY')),
+)
+
 def main():
     """Run all diagnostic checks."""
     print("")
-    print("╔" + "=" * 78 + "╗")
-    print("║" + " " * 20 + "GITHUB ACTIONS DIAGNOSTIC TOOL" + " " * 28 + "║")
-    print("╚" + "=" * 78 + "╝")
+    print(BANNER)
     print("")
     print("This script checks your GitHub Actions environment for common issues.")
     print("")
 
-    results = {
-        'Environment Variables': check_environment(),
-        'Required Files': check_files(),
-        'Python Packages': check_python_packages(),
-        'OpenAI API': test_openai_connection(),
-        'Supabase Database': test_supabase_connection(),
-    }
+    quick_mode = os.environ.get('DIAG_MODE', 'full').lower() == 'quick'
+
+    # The API tests are network-bound: start them in the background, run the
+    # local checks meanwhile, then print their captured output in order.
+    # A test whose environment variables are missing cannot pass, so it is not run.
+    router = ThreadOutputRouter(sys.stdout)
+    sys.stdout = router
+    try:
+        with ThreadPoolExecutor(max_workers=len(NETWORK_CHECKS)) as executor:
+            network_checks = {}
+            missing_vars = {}
+            for check, test, required_vars in NETWORK_CHECKS:
+                missing_vars[check] = [var for var in required_vars if not os.environ.get(var)]
+                if not quick_mode and not missing_vars[check]:
+                    network_checks[check] = executor.submit(run_captured, router, test)
+
+            results = {
+                'Environment Variables': check_environment(),
+                'Required Files': check_files(),
+                'Python Packages': check_python_packages(),
+            }
+
+            for check, _, _ in NETWORK_CHECKS:
+                if quick_mode:
+                    results[check] = None  # Not run; excluded from the pass count
+                    continue
+                if missing_vars[check]:
+                    results[check] = False
+                    print(f"⏭️  {check} test skipped - {', '.join(missing_vars[check])} not set")
+                    print("")
+                    continue
+                results[check], output = network_checks[check].result()
+                print(output, end="")
+    finally:
+        sys.stdout = router.stream
 
     # Summary
-    print("=" * 80)
+    print(SECTION_RULE)
     print("DIAGNOSTIC SUMMARY")
-    print("=" * 80)
+    print(SECTION_RULE)
     print("")
 
     passed = sum(1 for v in results.values() if v)
-    total = len(results)
+    total = sum(1 for v in results.values() if v is not None)
 
     for check, result in results.items():
-        status = "✅ PASS" if result else "❌ FAIL"
+        if result is None:
+            status = "⏭️  SKIPPED (DIAG_MODE=quick)"
+        else:
+            status = "✅ PASS" if result else "❌ FAIL"
         print(f"  {status} - {check}")
 
     print("")
@@ -6,12 +6,17 @@ Email Reports for Cosmic Diary
 
 import os
 import smtplib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
+from html import escape
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Tuple
 from supabase import create_client, Client
 
 # Try to load from .env file if python-dotenv is available
@@ -37,12 +42,109 @@ supabase: Client = None
 if SUPABASE_URL and SUPABASE_KEY:
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Columns the reports actually read - avoids shipping unused fields/JSONB
+EVENT_REPORT_COLUMNS = 'id, date, title, description, category, location, impact_level, event_type'
+CORRELATION_REPORT_COLUMNS = 'event_id, planet_name, correlation_score, reason'
+PLANETARY_REPORT_COLUMNS = 'date, planetary_data'
+
+# Impact levels in report order, and their bar colours
+IMPACT_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+IMPACT_COLORS = {
+    'low': '#10b981',
+    'medium': '#f59e0b',
+    'high': '#f97316',
+    'critical': '#ef4444'
+}
+
+# Shared HTTP session so fallback API calls reuse keep-alive connections
+# (pool size matches the number of parallel fallback workers)
+FALLBACK_FETCH_WORKERS = 8
+http_session = requests.Session()
+http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FALLBACK_FETCH_WORKERS)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+
+# Static daily summary markup (stylesheet and page chrome), built once at import
+DAILY_REPORT_HEAD = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 800px; margin: 0 auto; padding: 20px; }
+            .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 20px; }
+            .section { background: #f9f9f9; padding: 20px; margin: 20px 0; border-radius: 8px; border-left: 4px solid #667eea; }
+            .event { background: white; padding: 15px; margin: 10px 0; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+            .event-title { font-weight: bold; color: #667eea; font-size: 16px; }
+            .event-meta { color: #666; font-size: 12px; margin-top: 5px; }
+            .planet-grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; margin-top: 15px; }
+            .planet-item { background: white; padding: 10px; border-radius: 5px; text-align: center; }
+            .planet-name { font-weight: bold; color: #667eea; }
+            .planet-position { font-size: 12px; color: #666; }
+            .stats { display: flex; justify-content: space-around; margin: 20px 0; }
+            .stat-box { text-align: center; padding: 15px; background: white; border-radius: 5px; }
+            .stat-number { font-size: 24px; font-weight: bold; color: #667eea; }
+            .stat-label { font-size: 12px; color: #666; }
+        </style>
+    </head>
+    <body>
+        <div class="container">"""
+
+DAILY_REPORT_FOOTER = """
+            <div class="section" style="text-align: center; margin-top: 30px;">
+                <p style="color: #666;">Generated by Cosmic Diary - Your Astrological Research Companion</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+# Static weekly analysis report markup (stylesheet and page chrome), built once at import
+WEEKLY_REPORT_HEAD = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 900px; margin: 0 auto; padding: 20px; }
+            .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 20px; }
+            .section { background: #f9f9f9; padding: 20px; margin: 20px 0; border-radius: 8px; border-left: 4px solid #667eea; }
+            .chart-container { background: white; padding: 15px; border-radius: 5px; margin: 10px 0; }
+            .insight { background: #fff3cd; padding: 15px; border-radius: 5px; border-left: 4px solid #ffc107; margin: 15px 0; }
+            .insight-title { font-weight: bold; color: #856404; margin-bottom: 10px; }
+            .stats-grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin: 20px 0; }
+            .stat-card { background: white; padding: 20px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+            .stat-number { font-size: 32px; font-weight: bold; color: #667eea; }
+            .stat-label { font-size: 14px; color: #666; margin-top: 5px; }
+        </style>
+    </head>
+    <body>
+        <div class="container">"""
+
+WEEKLY_REPORT_FOOTER = """
+            </div>
+            
+            <div class="section" style="text-align: center; margin-top: 30px;">
+                <p style="color: #666;">Generated by Cosmic Diary - Your Astrological Research Companion</p>
+                <p style="color: #666; font-size: 12px;">Continue recording events to build a comprehensive database for pattern analysis</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """List every YYYY-MM-DD date from start_date to end_date (inclusive)"""
+    start = date.fromisoformat(start_date)
+    num_days = (date.fromisoformat(end_date) - start).days + 1
+    return [(start + timedelta(days=i)).isoformat() for i in range(num_days)]
+
 def get_events_from_api(date_str: str = None) -> List[Dict]:
     """Fetch events from Supabase (or fallback to API/JSON)"""
     # Try Supabase first
     if supabase:
         try:
-            query = supabase.table('events').select('*')
+            query = supabase.table('events').select(EVENT_REPORT_COLUMNS)
             if date_str:
                 query = query.eq('date', date_str)
             
@@ -60,7 +162,7 @@ def get_events_from_api(date_str: str = None) -> List[Dict]:
         if date_str:
             url += f"?date={date_str}"
         
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         if response.status_code == 200:
             events = response.json()
             if date_str and isinstance(events, list):
@@ -82,57 +184,131 @@ def get_events_from_api(date_str: str = None) -> List[Dict]:
     
     return []
 
+# Planetary data by date - positions for a date never change, so successful
+# lookups are kept for the life of the process (failures are not cached)
+planetary_data_cache: Dict[str, Dict] = {}
+
 def get_planetary_data_from_api(date_str: str) -> Dict:
     """Fetch planetary data from Supabase (or fallback to API)"""
+    if date_str in planetary_data_cache:
+        return planetary_data_cache[date_str]
+    
     # Try Supabase first
     if supabase:
         try:
             response = supabase.table('planetary_data')\
-                .select('*')\
+                .select(PLANETARY_REPORT_COLUMNS)\
                 .eq('date', date_str)\
-                .single()\
+                .limit(1)\
                 .execute()
             
+            # limit(1) returns an empty list for a missing date rather than
+            # raising like .single() does
             if response.data:
                 # Transform to expected format
-                data = response.data
+                data = response.data[0]
                 if data.get('planetary_data') and data['planetary_data'].get('planets'):
-                    return {
+                    planetary_data_cache[date_str] = {
                         'planetary_data': data['planetary_data']['planets']
                     }
+                    return planetary_data_cache[date_str]
         except Exception as e:
             print(f"⚠️ Error fetching from Supabase: {e}")
     
     # Fallback: Fetch from API
     try:
-        response = requests.get(
+        response = http_session.get(
             f"http://localhost:8000/api/planets/daily?date={date_str}",
             timeout=10
         )
         if response.status_code == 200:
-            return response.json()
+            planetary_data_cache[date_str] = response.json()
+            return planetary_data_cache[date_str]
     except Exception as e:
         print(f"Error fetching planetary data from API: {e}")
     return None
 
-def get_correlations_for_event(event_id: int) -> List[Dict]:
-    """Fetch planetary correlations for an event from Supabase"""
-    if not supabase:
-        return []
+def get_events_in_range(start_date: str, end_date: str) -> List[Dict]:
+    """Fetch all events between start_date and end_date (inclusive) in one query"""
+    if supabase:
+        try:
+            response = supabase.table('events')\
+                .select(EVENT_REPORT_COLUMNS)\
+                .gte('date', start_date)\
+                .lte('date', end_date)\
+                .execute()
+            return response.data or []
+        except Exception as e:
+            print(f"⚠️ Error fetching events range from Supabase: {e}")
     
-    try:
-        response = supabase.table('event_planetary_correlations')\
-            .select('*')\
-            .eq('event_id', event_id)\
-            .order('correlation_score', desc=True)\
-            .execute()
-        
-        if response.data:
-            return response.data
-    except Exception as e:
-        print(f"⚠️ Error fetching correlations: {e}")
+    # Fallback: fetch everything once and filter in memory (ISO dates sort lexically)
+    return [
+        e for e in get_events_from_api()
+        if start_date <= (e.get('date') or '') <= end_date
+    ]
+
+def get_planetary_data_batch(dates: List[str]) -> Dict[str, List[Dict]]:
+    """Fetch planet lists keyed by date for all the given dates in one query"""
+    planets_by_date = {}
+    missing_dates = []
+    for date_str in dates:
+        cached = planetary_data_cache.get(date_str)
+        if cached is None:
+            missing_dates.append(date_str)
+        elif cached.get('planetary_data'):
+            planets_by_date[date_str] = cached['planetary_data']
+    
+    if not missing_dates:
+        return planets_by_date
     
-    return []
+    if supabase:
+        try:
+            response = supabase.table('planetary_data')\
+                .select(PLANETARY_REPORT_COLUMNS)\
+                .in_('date', missing_dates)\
+                .execute()
+            for row in response.data or []:
+                planets = (row.get('planetary_data') or {}).get('planets')
+                if planets:
+                    planets_by_date[row['date']] = planets
+                    planetary_data_cache[row['date']] = {'planetary_data': planets}
+            return planets_by_date
+        except Exception as e:
+            print(f"⚠️ Error fetching planetary data batch from Supabase: {e}")
+    
+    # Fallback: per-day API calls (only when Supabase is unavailable), fanned out
+    # over the pooled http_session since each day is an independent request
+    with ThreadPoolExecutor(max_workers=FALLBACK_FETCH_WORKERS) as executor:
+        results = executor.map(get_planetary_data_from_api, missing_dates)
+    for date_str, planetary_data in zip(missing_dates, results):
+        if planetary_data and planetary_data.get('planetary_data'):
+            planets_by_date[date_str] = planetary_data['planetary_data']
+    return planets_by_date
+
+def get_retrograde_days(start_date: str, end_date: str) -> List[str]:
+    """Dates between start_date and end_date (inclusive) with any retrograde planet
+    
+    Reads the retrograde_days view (migration 011) so only matching dates are
+    returned; falls back to deriving them from the full planetary data.
+    """
+    if supabase:
+        try:
+            response = supabase.table('retrograde_days')\
+                .select('date')\
+                .gte('date', start_date)\
+                .lte('date', end_date)\
+                .order('date')\
+                .execute()
+            return [row['date'] for row in response.data or []]
+        except Exception as e:
+            print(f"⚠️ retrograde_days view unavailable, checking planetary data: {e}")
+    
+    dates = date_range(start_date, end_date)
+    planets_by_date = get_planetary_data_batch(dates)
+    return [
+        date_str for date_str in dates
+        if any(p.get('is_retrograde') for p in planets_by_date.get(date_str, []))
+    ]
 
 def get_correlations_for_date(date_str: str) -> Dict[int, List[Dict]]:
     """Fetch all correlations for events on a specific date"""
@@ -153,98 +329,172 @@ def get_correlations_for_date(date_str: str) -> Dict[int, List[Dict]]:
         
         # Get correlations for all events
         correlations_response = supabase.table('event_planetary_correlations')\
-            .select('*')\
+            .select(CORRELATION_REPORT_COLUMNS)\
             .in_('event_id', event_ids)\
             .order('correlation_score', desc=True)\
             .execute()
         
-        # Group by event_id
-        correlations_by_event = {}
-        if correlations_response.data:
-            for corr in correlations_response.data:
-                event_id = corr['event_id']
-                if event_id not in correlations_by_event:
-                    correlations_by_event[event_id] = []
-                correlations_by_event[event_id].append(corr)
+        # Group by event_id (rows arrive sorted by score, so each list stays sorted)
+        correlations_by_event = defaultdict(list)
+        for corr in correlations_response.data or []:
+            correlations_by_event[corr['event_id']].append(corr)
         
-        return correlations_by_event
+        return dict(correlations_by_event)
     except Exception as e:
         print(f"⚠️ Error fetching correlations for date: {e}")
     
     return {}
 
-def send_email(subject: str, html_body: str, text_body: str = None):
-    """Send email using SMTP"""
-    if not EMAIL_USER or not EMAIL_PASSWORD or not RECIPIENT_EMAIL:
+def email_configured() -> bool:
+    """Check whether SMTP credentials and a recipient are set"""
+    return bool(EMAIL_USER and EMAIL_PASSWORD and RECIPIENT_EMAIL)
+
+@contextmanager
+def smtp_session():
+    """Open one authenticated SMTP connection to send several emails over
+    
+    Yields None if email is not configured or the login fails, in which case
+    send_email falls back to its own connection / saving to file.
+    """
+    server = None
+    if email_configured():
+        try:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+            server.starttls()
+            server.login(EMAIL_USER, EMAIL_PASSWORD)
+        except Exception as e:
+            print(f"⚠️ Could not open SMTP session: {e}")
+            if server:
+                server.close()
+            server = None
+    
+    try:
+        yield server
+    finally:
+        if server:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+def build_message(subject: str, html_body: str, text_body: str = None) -> MIMEMultipart:
+    """Build the multipart (text + HTML) message for the configured recipient"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = EMAIL_USER
+    msg['To'] = RECIPIENT_EMAIL
+    
+    # Add both text and HTML versions
+    if text_body:
+        part1 = MIMEText(text_body, 'plain')
+        msg.attach(part1)
+    
+    part2 = MIMEText(html_body, 'html')
+    msg.attach(part2)
+    return msg
+
+def save_email_to_file(html_body: str) -> str:
+    """Write the HTML body to a timestamped file and return its name"""
+    # Microseconds keep several emails saved in the same second apart
+    output_file = f"email_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.html"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(html_body)
+    return output_file
+
+def send_email(subject: str, html_body: str, text_body: str = None, smtp: smtplib.SMTP = None):
+    """Send email using SMTP, reusing an open smtp_session() connection if given"""
+    if not email_configured():
         print("⚠️ Email configuration missing. Saving to file instead.")
-        # Save to file
-        output_file = f"email_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_body)
+        output_file = save_email_to_file(html_body)
         print(f"✅ Email saved to {output_file}")
         return
     
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = EMAIL_USER
-        msg['To'] = RECIPIENT_EMAIL
-        
-        # Add both text and HTML versions
-        if text_body:
-            part1 = MIMEText(text_body, 'plain')
-            msg.attach(part1)
-        
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part2)
+        msg = build_message(subject, html_body, text_body)
         
         # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
+        if smtp:
+            smtp.send_message(msg)
+        else:
+            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+                server.starttls()
+                server.login(EMAIL_USER, EMAIL_PASSWORD)
+                server.send_message(msg)
         
         print(f"✅ Email sent successfully to {RECIPIENT_EMAIL}")
     except Exception as e:
         print(f"❌ Error sending email: {e}")
         # Save to file as backup
-        output_file = f"email_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_body)
+        output_file = save_email_to_file(html_body)
         print(f"💾 Email saved to {output_file} as backup")
 
+def send_many(emails: List[Tuple[str, str, str]]):
+    """Send several (subject, html_body, text_body) emails over one SMTP login"""
+    with smtp_session() as smtp:
+        for subject, html_body, text_body in emails:
+            send_email(subject, html_body, text_body, smtp=smtp)
+
+def partition_events(events: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Split events into (world_events, personal_events) in a single pass"""
+    world_events = []
+    personal_events = []
+    for event in events:
+        event_type = event.get('event_type', 'world')
+        if event_type == 'world':
+            world_events.append(event)
+        elif event_type == 'personal':
+            personal_events.append(event)
+    return world_events, personal_events
+
+def summarize_events(events: List[Dict]) -> Dict:
+    """Count events per type, category and impact level"""
+    world_events, personal_events = partition_events(events)
+    return {
+        'total': len(events),
+        'world': len(world_events),
+        'personal': len(personal_events),
+        'categories': Counter(e.get('category', 'Other') for e in events),
+        'impacts': Counter(e.get('impact_level', 'medium') for e in events),
+    }
+
+def get_weekly_event_stats(start_date: str, end_date: str) -> Dict:
+    """Event counts for a date range, aggregated in Postgres when possible
+    
+    Uses the cosmic_weekly_stats() function (migration 010) so only one row per
+    type/category/impact level leaves the database; falls back to fetching the
+    events and counting them here.
+    """
+    if supabase:
+        try:
+            response = supabase.rpc('cosmic_weekly_stats', {
+                'start_date': start_date,
+                'end_date': end_date
+            }).execute()
+            
+            counts = {'event_type': Counter(), 'category': Counter(), 'impact_level': Counter()}
+            for row in response.data or []:
+                counts[row['dimension']][row['value']] += row['cnt']
+            
+            return {
+                'total': sum(counts['category'].values()),
+                'world': counts['event_type']['world'],
+                'personal': counts['event_type']['personal'],
+                'categories': counts['category'],
+                'impacts': counts['impact_level'],
+            }
+        except Exception as e:
+            print(f"⚠️ cosmic_weekly_stats unavailable, counting events locally: {e}")
+    
+    return summarize_events(get_events_in_range(start_date, end_date))
+
 def generate_daily_summary(date_str: str) -> str:
     """Generate daily summary HTML"""
     events = get_events_from_api(date_str)
     planetary_data = get_planetary_data_from_api(date_str)
     
-    world_events = [e for e in events if e.get('event_type', 'world') == 'world']
-    personal_events = [e for e in events if e.get('event_type') == 'personal']
+    world_events, personal_events = partition_events(events)
     
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 20px; }}
-            .section {{ background: #f9f9f9; padding: 20px; margin: 20px 0; border-radius: 8px; border-left: 4px solid #667eea; }}
-            .event {{ background: white; padding: 15px; margin: 10px 0; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-            .event-title {{ font-weight: bold; color: #667eea; font-size: 16px; }}
-            .event-meta {{ color: #666; font-size: 12px; margin-top: 5px; }}
-            .planet-grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; margin-top: 15px; }}
-            .planet-item {{ background: white; padding: 10px; border-radius: 5px; text-align: center; }}
-            .planet-name {{ font-weight: bold; color: #667eea; }}
-            .planet-position {{ font-size: 12px; color: #666; }}
-            .stats {{ display: flex; justify-content: space-around; margin: 20px 0; }}
-            .stat-box {{ text-align: center; padding: 15px; background: white; border-radius: 5px; }}
-            .stat-number {{ font-size: 24px; font-weight: bold; color: #667eea; }}
-            .stat-label {{ font-size: 12px; color: #666; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
+    parts = [DAILY_REPORT_HEAD, f"""
             <div class="header">
                 <h1>🌟 Cosmic Diary - Daily Summary</h1>
                 <p>Date: {date_str}</p>
@@ -264,88 +514,88 @@ def generate_daily_summary(date_str: str) -> str:
                     <div class="stat-label">Total Events</div>
                 </div>
             </div>
-    """
+    """]
     
     # Get correlations for all events
     correlations_by_event = get_correlations_for_date(date_str)
     
     if world_events:
-        html += """
+        parts.append("""
             <div class="section">
                 <h2>🌍 World Events</h2>
-        """
+        """)
         for event in world_events:
             event_id = event.get('id')
             correlations = correlations_by_event.get(event_id, []) if event_id else []
             
-            html += f"""
+            parts.append(f"""
                 <div class="event">
-                    <div class="event-title">{event.get('title', 'Unknown')}</div>
+                    <div class="event-title">{escape(event.get('title', 'Unknown'))}</div>
                     <div class="event-meta">
-                        {event.get('category', 'Other')} • {event.get('impact_level', 'medium').upper()} Impact
-                        {f"• {event.get('location', '')}" if event.get('location') else ''}
+                        {escape(event.get('category', 'Other'))} • {escape(event.get('impact_level', 'medium').upper())} Impact
+                        {f"• {escape(event.get('location', ''))}" if event.get('location') else ''}
                     </div>
-                    {f"<p style='margin-top: 10px;'>{event.get('description', '')}</p>" if event.get('description') else ''}
-            """
+                    {f"<p style='margin-top: 10px;'>{escape(event.get('description', ''))}</p>" if event.get('description') else ''}
+            """)
             
             # Add planetary correlations if available
             if correlations:
-                html += """
+                parts.append("""
                     <div style="margin-top: 15px; padding-top: 15px; border-top: 1px solid #e0e0e0;">
                         <div style="font-weight: bold; color: #667eea; margin-bottom: 10px;">🔮 Planetary Significance:</div>
                         <div style="display: flex; flex-wrap: wrap; gap: 10px;">
-                """
+                """)
                 for corr in correlations[:5]:  # Top 5 correlations
                     score = corr.get('correlation_score', 0)
                     planet = corr.get('planet_name', 'Unknown')
                     reason = corr.get('reason', '')
                     percentage = int(score * 100)
                     
-                    html += f"""
+                    parts.append(f"""
                         <div style="background: #f0f4ff; padding: 8px 12px; border-radius: 5px; flex: 1; min-width: 150px;">
-                            <div style="font-weight: bold; color: #667eea;">{planet}</div>
+                            <div style="font-weight: bold; color: #667eea;">{escape(planet)}</div>
                             <div style="font-size: 12px; color: #666; margin-top: 5px;">
                                 <div style="background: #e0e0e0; height: 6px; border-radius: 3px; margin-top: 5px;">
                                     <div style="background: #667eea; height: 100%; width: {percentage}%; border-radius: 3px;"></div>
                                 </div>
                                 <div style="margin-top: 3px;">{percentage}% relevance</div>
-                                {f"<div style='font-size: 11px; color: #888; margin-top: 3px;'>{reason}</div>" if reason else ''}
+                                {f"<div style='font-size: 11px; color: #888; margin-top: 3px;'>{escape(reason)}</div>" if reason else ''}
                             </div>
                         </div>
-                    """
-                html += """
+                    """)
+                parts.append("""
                         </div>
                     </div>
-                """
+                """)
             
-            html += "</div>"
-        html += "</div>"
+            parts.append("</div>")
+        parts.append("</div>")
     
     if personal_events:
-        html += """
+        parts.append("""
             <div class="section">
                 <h2>👤 Personal Events</h2>
-        """
+        """)
         for event in personal_events:
-            html += f"""
+            parts.append(f"""
                 <div class="event">
-                    <div class="event-title">{event.get('title', 'Unknown')}</div>
+                    <div class="event-title">{escape(event.get('title', 'Unknown'))}</div>
                     <div class="event-meta">
-                        {event.get('category', 'Other')} • {event.get('impact_level', 'medium').upper()} Impact
+                        {escape(event.get('category', 'Other'))} • {escape(event.get('impact_level', 'medium').upper())} Impact
                     </div>
-                    {f"<p style='margin-top: 10px;'>{event.get('description', '')}</p>" if event.get('description') else ''}
+                    {f"<p style='margin-top: 10px;'>{escape(event.get('description', ''))}</p>" if event.get('description') else ''}
                 </div>
-            """
-        html += "</div>"
+            """)
+        parts.append("</div>")
     
     if planetary_data and planetary_data.get('planetary_data'):
-        html += """
+        parts.append("""
             <div class="section">
                 <h2>🔮 Planetary Positions</h2>
                 <div class="planet-grid">
-        """
+        """)
         for planet in planetary_data['planetary_data']:
-            html += f"""
+            parts.append(f"""
                     <div class="planet-item">
                         <div class="planet-name">{planet.get('name', 'Unknown')}</div>
                         <div class="planet-position">
@@ -353,82 +603,27 @@ def generate_daily_summary(date_str: str) -> str:
                             {f"<br><span style='color: blue;'>Retrograde</span>" if planet.get('is_retrograde') else ''}
                         </div>
                     </div>
-            """
-        html += """
+            """)
+        parts.append("""
                 </div>
             </div>
-        """
+        """)
     
-    html += """
-            <div class="section" style="text-align: center; margin-top: 30px;">
-                <p style="color: #666;">Generated by Cosmic Diary - Your Astrological Research Companion</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    parts.append(DAILY_REPORT_FOOTER)
     
-    return html
+    return ''.join(parts)
 
 def generate_weekly_analysis(start_date: str, end_date: str) -> str:
     """Generate weekly analysis report HTML"""
-    # Get all events for the week
-    events = []
-    current_date = datetime.strptime(start_date, '%Y-%m-%d')
-    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-    
-    while current_date <= end_dt:
-        date_str = current_date.strftime('%Y-%m-%d')
-        day_events = get_events_from_api(date_str)
-        events.extend(day_events)
-        current_date += timedelta(days=1)
-    
-    world_events = [e for e in events if e.get('event_type', 'world') == 'world']
-    personal_events = [e for e in events if e.get('event_type') == 'personal']
+    # Get event counts and retrograde days for the week in one query each
+    stats = get_weekly_event_stats(start_date, end_date)
+    retrograde_days = get_retrograde_days(start_date, end_date)
     
-    # Analyze patterns
-    category_counts = {}
-    impact_counts = {}
-    retrograde_days = []
+    total_events = stats['total']
+    category_counts = stats['categories']
+    impact_counts = stats['impacts']
     
-    for event in events:
-        category = event.get('category', 'Other')
-        category_counts[category] = category_counts.get(category, 0) + 1
-        
-        impact = event.get('impact_level', 'medium')
-        impact_counts[impact] = impact_counts.get(impact, 0) + 1
-    
-    # Check retrograde days
-    current_date = datetime.strptime(start_date, '%Y-%m-%d')
-    while current_date <= end_dt:
-        date_str = current_date.strftime('%Y-%m-%d')
-        planetary_data = get_planetary_data_from_api(date_str)
-        if planetary_data and planetary_data.get('planetary_data'):
-            has_retrograde = any(p.get('is_retrograde') for p in planetary_data['planetary_data'])
-            if has_retrograde:
-                retrograde_days.append(date_str)
-        current_date += timedelta(days=1)
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 900px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 20px; }}
-            .section {{ background: #f9f9f9; padding: 20px; margin: 20px 0; border-radius: 8px; border-left: 4px solid #667eea; }}
-            .chart-container {{ background: white; padding: 15px; border-radius: 5px; margin: 10px 0; }}
-            .insight {{ background: #fff3cd; padding: 15px; border-radius: 5px; border-left: 4px solid #ffc107; margin: 15px 0; }}
-            .insight-title {{ font-weight: bold; color: #856404; margin-bottom: 10px; }}
-            .stats-grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin: 20px 0; }}
-            .stat-card {{ background: white; padding: 20px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-            .stat-number {{ font-size: 32px; font-weight: bold; color: #667eea; }}
-            .stat-label {{ font-size: 14px; color: #666; margin-top: 5px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
+    parts = [WEEKLY_REPORT_HEAD, f"""
             <div class="header">
                 <h1>🌟 Cosmic Diary - Weekly Analysis Report</h1>
                 <p>Week: {start_date} to {end_date}</p>
@@ -436,11 +631,11 @@ def generate_weekly_analysis(start_date: str, end_date: str) -> str:
             
             <div class="stats-grid">
                 <div class="stat-card">
-                    <div class="stat-number">{len(world_events)}</div>
+                    <div class="stat-number">{stats['world']}</div>
                     <div class="stat-label">World Events</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-number">{len(personal_events)}</div>
+                    <div class="stat-number">{stats['personal']}</div>
                     <div class="stat-label">Personal Events</div>
                 </div>
                 <div class="stat-card">
@@ -448,97 +643,82 @@ def generate_weekly_analysis(start_date: str, end_date: str) -> str:
                     <div class="stat-label">Retrograde Days</div>
                 </div>
             </div>
-    """
+    """]
     
     # Category distribution
     if category_counts:
-        html += """
+        parts.append("""
             <div class="section">
                 <h2>📊 Event Categories</h2>
                 <div class="chart-container">
-        """
+        """)
         for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / len(events)) * 100
-            html += f"""
+            percentage = (count / total_events) * 100
+            parts.append(f"""
                     <div style="margin: 10px 0;">
                         <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
-                            <span><strong>{category}</strong></span>
+                            <span><strong>{escape(category)}</strong></span>
                             <span>{count} events ({percentage:.1f}%)</span>
                         </div>
                         <div style="background: #e0e0e0; height: 20px; border-radius: 10px; overflow: hidden;">
                             <div style="background: #667eea; height: 100%; width: {percentage}%; transition: width 0.3s;"></div>
                         </div>
                     </div>
-            """
-        html += "</div></div>"
+            """)
+        parts.append("</div></div>")
     
     # Impact analysis
     if impact_counts:
-        html += """
+        parts.append("""
             <div class="section">
                 <h2>⚡ Impact Level Distribution</h2>
                 <div class="chart-container">
-        """
-        for impact, count in sorted(impact_counts.items(), key=lambda x: ['low', 'medium', 'high', 'critical'].index(x[0])):
-            percentage = (count / len(events)) * 100
-            color = {
-                'low': '#10b981',
-                'medium': '#f59e0b',
-                'high': '#f97316',
-                'critical': '#ef4444'
-            }.get(impact, '#667eea')
+        """)
+        for impact, count in sorted(impact_counts.items(), key=lambda x: IMPACT_RANK.get(x[0], len(IMPACT_RANK))):
+            percentage = (count / total_events) * 100
+            color = IMPACT_COLORS.get(impact, '#667eea')
             
-            html += f"""
+            parts.append(f"""
                     <div style="margin: 10px 0;">
                         <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
-                            <span><strong>{impact.upper()}</strong></span>
+                            <span><strong>{escape(impact.upper())}</strong></span>
                             <span>{count} events ({percentage:.1f}%)</span>
                         </div>
                         <div style="background: #e0e0e0; height: 20px; border-radius: 10px; overflow: hidden;">
                             <div style="background: {color}; height: 100%; width: {percentage}%;"></div>
                         </div>
                     </div>
-            """
-        html += "</div></div>"
+            """)
+        parts.append("</div></div>")
     
     # Astrological insights
-    html += """
+    parts.append("""
             <div class="section">
                 <h2>🔮 Astrological Insights</h2>
-    """
+    """)
     
     if retrograde_days:
-        html += f"""
+        parts.append(f"""
                 <div class="insight">
                     <div class="insight-title">Retrograde Periods</div>
                     <p>This week had {len(retrograde_days)} days with retrograde planets. Retrograde periods often correlate with delays, introspection, and revisiting past issues.</p>
                     <p><strong>Retrograde Days:</strong> {', '.join(retrograde_days)}</p>
                 </div>
-        """
+        """)
     
-    if personal_events:
-        html += f"""
+    if stats['personal']:
+        parts.append(f"""
                 <div class="insight">
                     <div class="insight-title">Personal Events Analysis</div>
-                    <p>You recorded {len(personal_events)} personal events this week. Review the planetary positions on those dates to identify patterns in your life.</p>
+                    <p>You recorded {stats['personal']} personal events this week. Review the planetary positions on those dates to identify patterns in your life.</p>
                 </div>
-        """
+        """)
     
-    html += """
-            </div>
-            
-            <div class="section" style="text-align: center; margin-top: 30px;">
-                <p style="color: #666;">Generated by Cosmic Diary - Your Astrological Research Companion</p>
-                <p style="color: #666; font-size: 12px;">Continue recording events to build a comprehensive database for pattern analysis</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    parts.append(WEEKLY_REPORT_FOOTER)
     
-    return html
+    return ''.join(parts)
 
-def send_daily_summary():
+def send_daily_summary(smtp: smtplib.SMTP = None):
     """Send daily summary email"""
     today = datetime.now().strftime('%Y-%m-%d')
     
@@ -557,10 +737,11 @@ def send_daily_summary():
     send_email(
         subject=f"🌟 Cosmic Diary - Daily Summary ({today})",
         html_body=html,
-        text_body=text
+        text_body=text,
+        smtp=smtp
     )
 
-def send_weekly_analysis():
+def send_weekly_analysis(smtp: smtplib.SMTP = None):
     """Send weekly analysis email"""
     today = datetime.now()
     # Get Monday of current week
@@ -577,7 +758,8 @@ def send_weekly_analysis():
     send_email(
         subject=f"🌟 Cosmic Diary - Weekly Analysis ({start_date} to {end_date})",
         html_body=html,
-        text_body=text
+        text_body=text,
+        smtp=smtp
     )
 
 if __name__ == '__main__':
@@ -588,8 +770,13 @@ if __name__ == '__main__':
             send_daily_summary()
         elif sys.argv[1] == 'weekly':
             send_weekly_analysis()
+        elif sys.argv[1] == 'both':
+            # One SMTP login for both reports
+            with smtp_session() as smtp:
+                send_daily_summary(smtp)
+                send_weekly_analysis(smtp)
         else:
-            print("Usage: python3 email_reports.py [daily|weekly]")
+            print("Usage: python3 email_reports.py [daily|weekly|both]")
     else:
         # Default: send daily summary
         send_daily_summary()
@@ -9,6 +9,7 @@ Author: Cosmic Diary System
 Date: 2024-12-16
 """
 
+import heapq
 import json
 import re
 from datetime import datetime, timedelta
@@ -19,6 +20,18 @@ from difflib import SequenceMatcher
 # Load filter configuration
 CONFIG_PATH = Path(__file__).parent / 'config' / 'event_filters.json'
 
+# Geographic scope hierarchy: local < state < national < international
+SCOPE_RANK = {'local': 0, 'state': 1, 'national': 2, 'international': 3}
+
+# Priority order: critical > high > medium > low
+IMPACT_PRIORITY = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
+
+
+def event_priority(event: Dict) -> int:
+    """Priority used to keep the best events when over the per-run limit."""
+    impact = IMPACT_PRIORITY.get(event.get('impact_level', 'low'), 0)
+    return (impact * 100) + event.get('research_score', 0)
+
 def load_filter_config() -> Dict:
     """Load event filtering configuration from JSON file."""
     try:
@@ -64,12 +77,81 @@ class EventQualityFilter:
         self.config = config or load_filter_config()
         self.filtering_enabled = self.config.get('filtering_mode', {}).get('enabled', True)
         self.mode = self.config.get('filtering_mode', {}).get('mode', 'balanced')
+        self._load_rules()
 
         print(f"🔍 Event Quality Filter initialized")
         print(f"   Mode: {self.mode}")
         print(f"   Filtering: {'ENABLED' if self.filtering_enabled else 'DISABLED'}")
         print("")
 
+    def _load_rules(self):
+        """
+        Read every filter setting from the config once.
+
+        The _check_* methods run for every event, so they use these attributes
+        instead of walking the nested config dicts on each call.
+        """
+        config = self.config
+        special_rules = config.get('special_rules', {})
+
+        impact_config = config.get('impact_level_filters', {})
+        self._allowed_levels = frozenset(impact_config.get('allowed_levels', ['medium', 'high', 'critical']))
+        self._always_allow_critical = special_rules.get('always_allow_critical', True)
+
+        category_config = config.get('category_filters', {})
+        self._enabled_categories = frozenset(category_config.get('enabled_categories', []))
+        self._disabled_categories = frozenset(category_config.get('disabled_categories', []))
+        self._always_allow_disasters = special_rules.get('always_allow_natural_disasters', True)
+        self._always_allow_wars = special_rules.get('always_allow_wars_conflicts', True)
+        self._always_allow_economic = special_rules.get('always_allow_economic_crises', True)
+
+        # Per impact level: ((deaths, injured, affected, financial) minimums,
+        # allow_if_astrologically_significant); levels without thresholds are absent
+        self._metric_thresholds = {}
+        for level_key, thresholds in config.get('impact_metrics_thresholds', {}).items():
+            if level_key.endswith('_level') and thresholds:
+                self._metric_thresholds[level_key[:-len('_level')]] = (
+                    (thresholds.get('deaths_min', float('inf')),
+                     thresholds.get('injured_min', float('inf')),
+                     thresholds.get('affected_min', float('inf')),
+                     thresholds.get('financial_impact_usd_min', float('inf'))),
+                    thresholds.get('allow_if_astrologically_significant', False)
+                )
+
+        geo_config = config.get('geographic_filters', {})
+        self._geo_enabled = geo_config.get('enabled', True)
+        # None if the configured minimum is not a known scope (allows everything)
+        self._min_scope_rank = SCOPE_RANK.get(geo_config.get('minimum_geographic_scope', 'state'))
+
+        blacklist_config = config.get('keyword_filters', {}).get('blacklist', {})
+        self._blacklist_enabled = blacklist_config.get('enabled', True)
+        self._blacklist = tuple(keyword.lower() for keyword in blacklist_config.get('keywords', []))
+
+        scoring_config = config.get('quality_scoring', {})
+        self._scoring_enabled = scoring_config.get('enabled', True)
+        self._min_research_score = scoring_config.get('minimum_research_score', 40)
+
+        validation_config = config.get('validation_rules', {})
+        self._required_fields = tuple(
+            field for field in ('title', 'date', 'description', 'location', 'category')
+            if validation_config.get(f'require_{field}', True)
+        )
+        self._min_desc = validation_config.get('min_description_length', 100)
+        self._max_desc = validation_config.get('max_description_length', 1000)
+        self._min_title = validation_config.get('min_title_length', 10)
+        self._max_title = validation_config.get('max_title_length', 150)
+
+        time_config = config.get('time_window_filters', {})
+        self._time_window_enabled = time_config.get('enabled', True)
+        self._max_age_hours = time_config.get('max_event_age_hours', 72)
+
+        dedup_config = config.get('deduplication', {})
+        self._dedup_enabled = dedup_config.get('enabled', True)
+        self._dedup_threshold = dedup_config.get('similarity_threshold', 0.85)
+        self._dedup_check_hours = dedup_config.get('check_within_hours', 48)
+
+        self._max_events_per_run = config.get('collection_limits', {}).get('max_events_per_run', 15)
+
     def filter_events(self, events: List[Dict], existing_events: List[Dict] = None) -> Tuple[List[Dict], Dict]:
         """
         Apply all filtering rules to a list of events.
@@ -100,9 +182,12 @@ class EventQualityFilter:
             'rejection_reasons': {}
         }
 
+        # Index existing events once per run instead of re-parsing them per event
+        dedup_index = self._build_dedup_index(existing_events)
+
         for i, event in enumerate(events, 1):
             # Apply all filter checks
-            passed, reason = self._apply_filters(event, existing_events)
+            passed, reason = self._apply_filters(event, dedup_index)
 
             if passed:
                 filtered_events.append(event)
@@ -118,10 +203,10 @@ class EventQualityFilter:
                     print(f"    Reason: {reason}")
 
         # Check collection limits
-        max_events = self.config.get('collection_limits', {}).get('max_events_per_run', 15)
+        max_events = self._max_events_per_run
         if len(filtered_events) > max_events:
             print(f"\n⚠️  {len(filtered_events)} events passed filters, limiting to {max_events}")
-            filtered_events = self._prioritize_events(filtered_events)[:max_events]
+            filtered_events = self._prioritize_events(filtered_events, limit=max_events)
 
         print("")
         print("=" * 80)
@@ -141,10 +226,14 @@ class EventQualityFilter:
 
         return filtered_events, filter_stats
 
-    def _apply_filters(self, event: Dict, existing_events: List[Dict] = None) -> Tuple[bool, str]:
+    def _apply_filters(self, event: Dict, dedup_index: Dict = None) -> Tuple[bool, str]:
         """
         Apply all filter rules to a single event.
 
+        Args:
+            event: Event dictionary to check
+            dedup_index: Existing events indexed by _build_dedup_index()
+
         Returns:
             Tuple of (passed: bool, rejection_reason: str)
         """
@@ -181,82 +270,72 @@ class EventQualityFilter:
             return False, "Event too old"
 
         # 9. Deduplication Filter
-        if existing_events and not self._check_deduplication(event, existing_events):
+        if dedup_index and not self._check_deduplication(event, dedup_index):
             return False, "Duplicate event (already in database)"
 
         return True, "Passed all filters"
 
     def _check_impact_level(self, event: Dict) -> bool:
         """Check if event meets minimum impact level requirement."""
-        impact_config = self.config.get('impact_level_filters', {})
-        min_level = impact_config.get('minimum_impact_level', 'medium')
-        allowed_levels = impact_config.get('allowed_levels', ['medium', 'high', 'critical'])
-
         event_impact = event.get('impact_level', 'low')
 
         # Special rules: Always allow critical events
-        special_rules = self.config.get('special_rules', {})
-        if special_rules.get('always_allow_critical', True) and event_impact == 'critical':
+        if self._always_allow_critical and event_impact == 'critical':
             return True
 
-        return event_impact in allowed_levels
+        return event_impact in self._allowed_levels
 
     def _check_category(self, event: Dict) -> bool:
         """Check if event category is enabled."""
-        category_config = self.config.get('category_filters', {})
-        enabled_categories = category_config.get('enabled_categories', [])
-        disabled_categories = category_config.get('disabled_categories', [])
-
         event_category = event.get('category', '')
 
         # Special rules: Always allow certain categories
-        special_rules = self.config.get('special_rules', {})
         category_lower = event_category.lower()
 
-        if special_rules.get('always_allow_natural_disasters', True) and 'disaster' in category_lower:
+        if self._always_allow_disasters and 'disaster' in category_lower:
             return True
-        if special_rules.get('always_allow_wars_conflicts', True) and ('war' in category_lower or 'conflict' in category_lower):
+        if self._always_allow_wars and ('war' in category_lower or 'conflict' in category_lower):
             return True
-        if special_rules.get('always_allow_economic_crises', True) and 'economic' in category_lower and event.get('impact_level') in ['high', 'critical']:
+        if self._always_allow_economic and 'economic' in category_lower and event.get('impact_level') in ('high', 'critical'):
             return True
 
         # Check if category is explicitly disabled
-        if event_category in disabled_categories:
+        if event_category in self._disabled_categories:
             # Allow if critical impact
             if event.get('impact_level') == 'critical':
                 return True
             return False
 
         # If enabled_categories is empty, allow all (except disabled)
-        if not enabled_categories:
+        if not self._enabled_categories:
             return True
 
-        return event_category in enabled_categories
+        return event_category in self._enabled_categories
 
     def _check_impact_metrics(self, event: Dict) -> bool:
         """Check if event meets impact metric thresholds."""
-        metrics_config = self.config.get('impact_metrics_thresholds', {})
         event_impact = event.get('impact_level', 'low')
         event_metrics = event.get('impact_metrics', {})
 
         # Get thresholds for this impact level
-        level_key = f"{event_impact}_level"
-        thresholds = metrics_config.get(level_key, {})
+        level_thresholds = self._metric_thresholds.get(event_impact)
 
-        if not thresholds:
+        if level_thresholds is None:
             # No thresholds defined for this level, allow it
             return True
 
+        (deaths_min, injured_min, affected_min, financial_min), allow_if_astro = level_thresholds
+
         # Check if event meets AT LEAST ONE threshold
         deaths = event_metrics.get('deaths') or 0
         injured = event_metrics.get('injured') or 0
         affected = event_metrics.get('affected') or 0
         financial = event_metrics.get('financial_impact_usd') or 0
 
-        meets_deaths = deaths >= thresholds.get('deaths_min', float('inf'))
-        meets_injured = injured >= thresholds.get('injured_min', float('inf'))
-        meets_affected = affected >= thresholds.get('affected_min', float('inf'))
-        meets_financial = financial >= thresholds.get('financial_impact_usd_min', float('inf'))
+        meets_deaths = deaths >= deaths_min
+        meets_injured = injured >= injured_min
+        meets_affected = affected >= affected_min
+        meets_financial = financial >= financial_min
 
         # If any metric meets threshold, pass
         if meets_deaths or meets_injured or meets_affected or meets_financial:
@@ -264,7 +343,7 @@ class EventQualityFilter:
 
         # For low impact, check if astrologically significant
         if event_impact == 'low':
-            if thresholds.get('allow_if_astrologically_significant', False):
+            if allow_if_astro:
                 astro = event.get('astrological_relevance', {})
                 if astro.get('primary_houses') and astro.get('primary_planets'):
                     return True
@@ -277,16 +356,11 @@ class EventQualityFilter:
 
     def _check_geographic_scope(self, event: Dict) -> bool:
         """Check if event meets geographic scope requirements."""
-        geo_config = self.config.get('geographic_filters', {})
-        if not geo_config.get('enabled', True):
+        if not self._geo_enabled:
             return True
 
         event_metrics = event.get('impact_metrics', {})
         geo_scope = event_metrics.get('geographic_scope', 'unknown')
-        min_scope = geo_config.get('minimum_geographic_scope', 'state')
-
-        # Scope hierarchy: local < state < national < international
-        scope_hierarchy = ['local', 'state', 'national', 'international']
 
         # Allow if critical impact
         if event.get('impact_level') == 'critical':
@@ -296,29 +370,22 @@ class EventQualityFilter:
         if geo_scope == 'unknown':
             return True
 
-        try:
-            event_scope_index = scope_hierarchy.index(geo_scope)
-            min_scope_index = scope_hierarchy.index(min_scope)
-            return event_scope_index >= min_scope_index
-        except ValueError:
+        event_scope_rank = SCOPE_RANK.get(geo_scope)
+        if event_scope_rank is None or self._min_scope_rank is None:
             # Invalid scope value, allow
             return True
+        return event_scope_rank >= self._min_scope_rank
 
     def _check_keyword_blacklist(self, event: Dict) -> bool:
         """Check if event contains blacklisted keywords."""
-        keyword_config = self.config.get('keyword_filters', {}).get('blacklist', {})
-        if not keyword_config.get('enabled', True):
-            return True
-
-        blacklist = keyword_config.get('keywords', [])
-        if not blacklist:
+        if not self._blacklist_enabled or not self._blacklist:
             return True
 
         # Combine title and description for checking
         text = f"{event.get('title', '')} {event.get('description', '')}".lower()
 
-        for keyword in blacklist:
-            if keyword.lower() in text:
+        for keyword in self._blacklist:
+            if keyword in text:
                 # Allow if critical impact
                 if event.get('impact_level') == 'critical':
                     return True
@@ -328,54 +395,33 @@ class EventQualityFilter:
 
     def _check_quality_score(self, event: Dict) -> bool:
         """Check if event meets minimum research quality score."""
-        scoring_config = self.config.get('quality_scoring', {})
-        if not scoring_config.get('enabled', True):
+        if not self._scoring_enabled:
             return True
 
-        min_score = scoring_config.get('minimum_research_score', 40)
-        event_score = event.get('research_score', 0)
-
-        return event_score >= min_score
+        return event.get('research_score', 0) >= self._min_research_score
 
     def _check_validation_rules(self, event: Dict) -> bool:
         """Check if event meets basic validation rules."""
-        validation_config = self.config.get('validation_rules', {})
-
         # Check required fields
-        if validation_config.get('require_title', True) and not event.get('title'):
-            return False
-        if validation_config.get('require_date', True) and not event.get('date'):
-            return False
-        if validation_config.get('require_description', True) and not event.get('description'):
-            return False
-        if validation_config.get('require_location', True) and not event.get('location'):
-            return False
-        if validation_config.get('require_category', True) and not event.get('category'):
-            return False
+        for field in self._required_fields:
+            if not event.get(field):
+                return False
 
         # Check description length
-        desc = event.get('description', '')
-        min_desc = validation_config.get('min_description_length', 100)
-        max_desc = validation_config.get('max_description_length', 1000)
-        if len(desc) < min_desc or len(desc) > max_desc:
+        if not self._min_desc <= len(event.get('description', '')) <= self._max_desc:
             return False
 
         # Check title length
-        title = event.get('title', '')
-        min_title = validation_config.get('min_title_length', 10)
-        max_title = validation_config.get('max_title_length', 150)
-        if len(title) < min_title or len(title) > max_title:
+        if not self._min_title <= len(event.get('title', '')) <= self._max_title:
             return False
 
         return True
 
     def _check_time_window(self, event: Dict) -> bool:
         """Check if event is within acceptable time window."""
-        time_config = self.config.get('time_window_filters', {})
-        if not time_config.get('enabled', True):
+        if not self._time_window_enabled:
             return True
 
-        max_age_hours = time_config.get('max_event_age_hours', 72)
         event_date_str = event.get('date')
 
         if not event_date_str:
@@ -384,21 +430,42 @@ class EventQualityFilter:
         try:
             event_date = datetime.strptime(event_date_str, '%Y-%m-%d')
             age_hours = (datetime.now() - event_date).total_seconds() / 3600
-            return age_hours <= max_age_hours
+            return age_hours <= self._max_age_hours
         except ValueError:
             return True  # Invalid date format, allow
 
-    def _check_deduplication(self, event: Dict, existing_events: List[Dict]) -> bool:
-        """Check if event is a duplicate of existing events."""
-        dedup_config = self.config.get('deduplication', {})
-        if not dedup_config.get('enabled', True):
-            return True
+    def _build_dedup_index(self, existing_events: List[Dict] = None) -> Dict:
+        """
+        Group existing events by date for deduplication.
+
+        Each entry holds the lowercased title and a slot for a SequenceMatcher
+        with that title as its second sequence. The matcher is created the
+        first time the title is compared, so difflib's lookup table for it is
+        built at most once per run and reused for every incoming event.
+
+        Args:
+            existing_events: List of recent events from database
+
+        Returns:
+            Dict mapping event date -> list of [title, SequenceMatcher or None]
+        """
+        dedup_index = {}
+        for existing in existing_events or []:
+            try:
+                existing_date = datetime.strptime(existing.get('date', ''), '%Y-%m-%d')
+            except ValueError:
+                continue  # Can't check date, never matches
+            dedup_index.setdefault(existing_date, []).append(
+                [existing.get('title', '').lower(), None]
+            )
+        return dedup_index
 
-        if not existing_events:
+    def _check_deduplication(self, event: Dict, dedup_index: Dict) -> bool:
+        """Check if event is a duplicate of existing events."""
+        if not self._dedup_enabled or not dedup_index:
             return True
 
-        threshold = dedup_config.get('similarity_threshold', 0.85)
-        check_hours = dedup_config.get('check_within_hours', 48)
+        threshold = self._dedup_threshold
 
         event_title = event.get('title', '').lower()
         event_date_str = event.get('date', '')
@@ -408,35 +475,45 @@ class EventQualityFilter:
         except ValueError:
             return True  # Can't check date, allow
 
-        for existing in existing_events:
-            # Check date proximity
-            try:
-                existing_date = datetime.strptime(existing.get('date', ''), '%Y-%m-%d')
-                hours_diff = abs((event_date - existing_date).total_seconds() / 3600)
+        # Dates are whole days, so only buckets within check_hours // 24 days
+        # of the event can fall inside the window
+        window_days = int(self._dedup_check_hours // 24)
+        for offset in range(-window_days, window_days + 1):
+            for entry in dedup_index.get(event_date + timedelta(days=offset), ()):
+                existing_title, matcher = entry
 
-                if hours_diff <= check_hours:
-                    # Check title similarity
-                    existing_title = existing.get('title', '').lower()
-                    similarity = SequenceMatcher(None, event_title, existing_title).ratio()
+                # Identical titles are a ratio of 1.0
+                if event_title == existing_title:
+                    return False  # Duplicate found
 
-                    if similarity >= threshold:
-                        return False  # Duplicate found
-            except ValueError:
-                continue
+                if matcher is None:
+                    matcher = entry[1] = SequenceMatcher(None, '', existing_title)
+
+                # Check title similarity, escalating through difflib's cheap
+                # upper bounds before computing the full ratio
+                matcher.set_seq1(event_title)
+                if (matcher.real_quick_ratio() >= threshold
+                        and matcher.quick_ratio() >= threshold
+                        and matcher.ratio() >= threshold):
+                    return False  # Duplicate found
 
         return True  # Not a duplicate
 
-    def _prioritize_events(self, events: List[Dict]) -> List[Dict]:
-        """Sort events by priority (research score, impact level)."""
-        # Priority order: critical > high > medium > low
-        impact_priority = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
+    def _prioritize_events(self, events: List[Dict], limit: int = None) -> List[Dict]:
+        """
+        Sort events by priority (research score, impact level).
 
-        def get_priority(event):
-            impact = impact_priority.get(event.get('impact_level', 'low'), 0)
-            score = event.get('research_score', 0)
-            return (impact * 100) + score
+        Args:
+            events: Events that passed the filters
+            limit: If given, only the top `limit` events are selected (same
+                order as a full sort, without sorting the rest)
 
-        return sorted(events, key=get_priority, reverse=True)
+        Returns:
+            Events in descending priority order
+        """
+        if limit is not None:
+            return heapq.nlargest(limit, events, key=event_priority)
+        return sorted(events, key=event_priority, reverse=True)
 
 
 def apply_event_filters(events: List[Dict], existing_events: List[Dict] = None,
@@ -7,12 +7,13 @@ Runs via cron: 30 11 * * * and 30 23 * * * (11:30 AM and 11:30 PM IST)
 import os
 import sys
 import json
+import asyncio
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
 import requests
 from openai import OpenAI
 from supabase import create_client, Client
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 # Import enhanced prompt system
 sys.path.append(os.path.dirname(__file__))
@@ -22,6 +23,7 @@ from prompts.event_detection_prompt import (
     validate_event_response,
     calculate_research_score
 )
+from db_inserts import insert_rows
 
 load_dotenv()
 
@@ -59,24 +61,15 @@ def fetch_recent_events_via_openai(client: OpenAI, target_date: date) -> List[Di
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
-            max_tokens=3500  # Increased for detailed responses
+            max_tokens=3500,  # Increased for detailed responses
+            response_format={"type": "json_object"}  # Bare JSON object, no markdown fences
         )
         
         content = response.choices[0].message.content.strip()
         
-        # Parse JSON response
-        # Remove markdown code blocks if present
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-        
+        # Parse JSON response (the prompt asks for an object with an "events" array)
         events = json.loads(content)
         if not isinstance(events, list):
-            # Sometimes OpenAI wraps in an object
             if isinstance(events, dict) and 'events' in events:
                 events = events['events']
             else:
@@ -113,75 +106,120 @@ def get_planetary_data_for_date(target_date: date) -> Optional[Dict]:
         return None
 
 
-def store_event(supabase: Client, event_data: Dict, target_date: date, planetary_data: Optional[List]) -> Optional[int]:
-    """Store event in Supabase with enhanced astrological metadata"""
-    try:
-        # Extract astrological relevance if available
-        astro_relevance = event_data.get('astrological_relevance', {})
-        
-        # Prepare astrological_metadata JSONB structure
-        astrological_metadata = None
-        if astro_relevance:
-            astrological_metadata = {
-                'primary_houses': astro_relevance.get('primary_houses', []),
-                'primary_planets': astro_relevance.get('primary_planets', []),
-                'keywords': astro_relevance.get('keywords', []),
-                'reasoning': astro_relevance.get('reasoning', '')
-            }
-        
-        # Extract impact_metrics
-        impact_metrics = event_data.get('impact_metrics', {})
-        
-        # Extract research_score (already calculated in main())
-        research_score = event_data.get('research_score')
-        
-        # Extract sources
-        sources = event_data.get('sources', [])
-        if not isinstance(sources, list):
-            sources = []
-        
-        # Prepare event record
-        event_record = {
-            'date': event_data.get('date', target_date.isoformat()),
-            'title': event_data.get('title', ''),
-            'description': event_data.get('description', ''),
-            'category': event_data.get('category', 'Other'),
-            'location': event_data.get('location', ''),
-            'latitude': event_data.get('latitude'),
-            'longitude': event_data.get('longitude'),
-            'impact_level': event_data.get('impact_level', 'medium'),
-            'event_type': 'world',
-            'tags': event_data.get('tags', []),
-            # Enhanced time fields
-            'event_time': event_data.get('time') if event_data.get('time') and event_data.get('time') != 'estimated' else None,
-            'timezone': event_data.get('timezone', 'UTC'),
-            'has_accurate_time': event_data.get('time') is not None and event_data.get('time') != 'estimated',
-            # NEW: Astrological metadata fields (Migration 007)
-            'astrological_metadata': astrological_metadata,
-            'impact_metrics': impact_metrics if impact_metrics else None,
-            'research_score': research_score,
-            'sources': sources
+async def fetch_events_and_planetary_data(
+    client: OpenAI,
+    target_date: date
+) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Fetch events from OpenAI and planetary data for the date concurrently.
+
+    The two requests are independent blocking calls, so each runs in a worker
+    thread and the wait is max(OpenAI, planets) instead of their sum.
+
+    Args:
+        client: OpenAI client
+        target_date: Date to collect events for
+
+    Returns:
+        Tuple of (events, planetary_data)
+    """
+    return await asyncio.gather(
+        asyncio.to_thread(fetch_recent_events_via_openai, client, target_date),
+        asyncio.to_thread(get_planetary_data_for_date, target_date)
+    )
+
+
+def build_event_record(event_data: Dict, target_date: date) -> Dict:
+    """
+    Build the events table row for an event returned by OpenAI.
+
+    Args:
+        event_data: Validated event dictionary
+        target_date: Date the events were collected for
+
+    Returns:
+        Row dictionary with enhanced astrological metadata (Migration 007)
+    """
+    # Extract astrological relevance if available
+    astro_relevance = event_data.get('astrological_relevance', {})
+    
+    # Prepare astrological_metadata JSONB structure
+    astrological_metadata = None
+    if astro_relevance:
+        astrological_metadata = {
+            'primary_houses': astro_relevance.get('primary_houses', []),
+            'primary_planets': astro_relevance.get('primary_planets', []),
+            'keywords': astro_relevance.get('keywords', []),
+            'reasoning': astro_relevance.get('reasoning', '')
         }
-        
-        result = supabase.table('events').insert(event_record).execute()
-        
-        if result.data and len(result.data) > 0:
-            event_id = result.data[0]['id']
-            print(f"✅ Stored event: {event_record['title']} (ID: {event_id})")
-            if research_score is not None:
-                print(f"   Research Score: {research_score:.2f}/100")
-            if astrological_metadata:
-                print(f"   Houses: {astro_relevance.get('primary_houses', [])}, Planets: {astro_relevance.get('primary_planets', [])}")
-            return event_id
+    
+    # Extract impact_metrics
+    impact_metrics = event_data.get('impact_metrics', {})
+    
+    # Extract sources
+    sources = event_data.get('sources', [])
+    if not isinstance(sources, list):
+        sources = []
+    
+    return {
+        'date': event_data.get('date', target_date.isoformat()),
+        'title': event_data.get('title', ''),
+        'description': event_data.get('description', ''),
+        'category': event_data.get('category', 'Other'),
+        'location': event_data.get('location', ''),
+        'latitude': event_data.get('latitude'),
+        'longitude': event_data.get('longitude'),
+        'impact_level': event_data.get('impact_level', 'medium'),
+        'event_type': 'world',
+        'tags': event_data.get('tags', []),
+        # Enhanced time fields
+        'event_time': event_data.get('time') if event_data.get('time') and event_data.get('time') != 'estimated' else None,
+        'timezone': event_data.get('timezone', 'UTC'),
+        'has_accurate_time': event_data.get('time') is not None and event_data.get('time') != 'estimated',
+        # NEW: Astrological metadata fields (Migration 007)
+        'astrological_metadata': astrological_metadata,
+        'impact_metrics': impact_metrics if impact_metrics else None,
+        # research_score is already calculated in main()
+        'research_score': event_data.get('research_score'),
+        'sources': sources
+    }
+
+
+def store_events(supabase: Client, events: List[Dict], target_date: date) -> List[Optional[int]]:
+    """
+    Store events in Supabase with a single bulk insert.
+
+    Uses db_inserts.insert_rows(), which retries rows individually when the
+    statement is rejected and never re-sends a batch whose outcome is unknown.
+
+    Args:
+        supabase: Supabase client
+        events: Validated event dictionaries
+        target_date: Date the events were collected for
+
+    Returns:
+        Event IDs aligned with the input; None where an event was not stored
+    """
+    if not events:
+        return []
+    
+    records = [build_event_record(event, target_date) for event in events]
+    event_ids = [row['id'] if row else None for row in insert_rows(supabase, 'events', records)]
+    
+    for i, (record, event_id) in enumerate(zip(records, event_ids), 1):
+        print(f"[{i}/{len(records)}] {record['title'][:60]}")
+        if event_id:
+            print(f"✅ Stored event: {record['title']} (ID: {event_id})")
+            if record['research_score'] is not None:
+                print(f"   Research Score: {record['research_score']:.2f}/100")
+            metadata = record['astrological_metadata']
+            if metadata:
+                print(f"   Houses: {metadata['primary_houses']}, Planets: {metadata['primary_planets']}")
         else:
-            print(f"❌ Failed to store event: {event_record['title']}")
-            return None
+            print(f"❌ Failed to store event: {record['title']}")
+        print()
     
-    except Exception as e:
-        print(f"❌ Error storing event: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    return event_ids
 
 
 def main():
@@ -222,11 +260,13 @@ def main():
     print(f"📅 Collecting events for: {target_date.isoformat()}")
     print()
     
-    # Fetch events from OpenAI
+    # Fetch events from OpenAI (planetary data for STEP 4 is fetched alongside)
     print("-"*80)
     print("STEP 1: FETCHING EVENTS FROM OPENAI")
     print("-"*80)
-    events = fetch_recent_events_via_openai(openai_client, target_date)
+    events, planetary_data = asyncio.run(
+        fetch_events_and_planetary_data(openai_client, target_date)
+    )
     
     if not events:
         print("⚠️ No events collected from OpenAI")
@@ -311,29 +351,17 @@ def main():
         print(f"    - No time: {no_time}")
     print()
     
-    # Get planetary data for the date
+    # Planetary data was fetched during STEP 1
     print("-"*80)
     print("STEP 4: STORING EVENTS")
     print("-"*80)
-    planetary_data = get_planetary_data_for_date(target_date)
-    
     if not planetary_data:
         print("⚠️ Warning: No planetary data available for this date")
     print()
     
-    # Store each event
-    success_count = 0
-    event_ids = []
-    
-    for i, event in enumerate(selected_events, 1):
-        print(f"[{i}/{len(selected_events)}] Storing: {event.get('title', 'Unknown')[:60]}...")
-        print(f"    Research Score: {event.get('research_score', 0):.2f}/100")
-        
-        event_id = store_event(supabase, event, target_date, planetary_data)
-        if event_id:
-            success_count += 1
-            event_ids.append(event_id)
-        print()
+    # Store all events in one bulk insert
+    event_ids = [event_id for event_id in store_events(supabase, selected_events, target_date) if event_id]
+    success_count = len(event_ids)
     
     # Final summary
     print("="*80)
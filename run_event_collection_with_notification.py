@@ -66,6 +66,16 @@ EMAIL_USER = os.getenv('EMAIL_USER', '')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
 RECIPIENT_EMAIL = os.getenv('RECIPIENT_EMAIL', EMAIL_USER)
 
+_supabase_client: Optional[Client] = None
+
+
+def get_supabase_client() -> Client:
+    """Return the process-wide Supabase client, creating it on first use."""
+    global _supabase_client
+    if _supabase_client is None:
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase_client
+
 def fetch_events_for_date(target_date: date) -> Tuple[List[Dict], str]:
     """
     Fetch events for a specific date using hybrid approach (NewsAPI + OpenAI).
@@ -161,8 +171,7 @@ def create_event_with_analysis(
                 'tags': event_data.get('tags', [])
             }
 
-            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-            result = supabase.table('events').insert(event_record).execute()
+            result = get_supabase_client().table('events').insert(event_record).execute()
 
             if result.data:
                 return result.data[0].get('id'), None, False
@@ -188,12 +197,14 @@ def create_event_with_analysis(
         correlation_created = False
         if snapshot_id and snapshot_chart and event_chart:
             try:
-                correlation_created = correlate_and_store(
+                correlation = correlate_and_store(
                     event_id=event_id,
                     event_chart=event_chart,
                     snapshot_id=snapshot_id,
-                    snapshot_chart=snapshot_chart
+                    snapshot_chart=snapshot_chart,
+                    event_date=event_data.get('date')
                 )
+                correlation_created = correlation is not None
             except Exception as corr_error:
                 print(f"  ⚠️  Could not create correlation: {corr_error}")
 
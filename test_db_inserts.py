@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test Script for Bulk Insert Helper
+
+Tests db_inserts.insert_rows against an in-memory stand-in for the Supabase
+client, without requiring database connections.
+
+Usage:
+    python test_db_inserts.py
+
+Author: Cosmic Diary System
+Date: 2026-10-16
+"""
+
+from typing import Dict, List
+
+from postgrest.exceptions import APIError
+
+from db_inserts import insert_rows
+
+
+def print_section(title: str):
+    """Print a formatted section header."""
+    print(f"\n{'='*80}")
+    print(f"{title}")
+    print(f"{'='*80}\n")
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeClient:
+    """Records insert calls; `bulk` decides how the multi-row insert behaves."""
+
+    def __init__(self, bulk=None, reject_titles=()):
+        self.bulk = bulk
+        self.reject_titles = reject_titles
+        self.calls: List = []
+        self.next_id = 1
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.pending = rows
+        return self
+
+    def _store(self, row: Dict) -> Dict:
+        stored = dict(row, id=self.next_id)
+        self.next_id += 1
+        return stored
+
+    def execute(self):
+        rows = self.pending
+        self.calls.append(rows)
+        if isinstance(rows, list):
+            if isinstance(self.bulk, Exception):
+                raise self.bulk
+            stored = [self._store(row) for row in rows]
+            return FakeResult(self.bulk(stored) if self.bulk else stored)
+        if rows['title'] in self.reject_titles:
+            raise APIError({'message': 'rejected'})
+        return FakeResult([self._store(rows)])
+
+
+ROWS = [{'title': 'a', 'date': '2026-01-01'}, {'title': 'b', 'date': '2026-01-01'},
+        {'title': 'c', 'date': '2026-01-01'}]
+
+
+def test_bulk_insert():
+    """Test the single-request happy path."""
+    print_section("TEST: Bulk insert")
+    client = FakeClient()
+    inserted = insert_rows(client, 'events', ROWS)
+    assert [row['id'] for row in inserted] == [1, 2, 3]
+    assert len(client.calls) == 1
+
+
+def test_partial_result_is_aligned():
+    """Test that rows missing from the response don't discard the ones returned."""
+    print_section("TEST: Partial bulk result")
+    client = FakeClient(bulk=lambda stored: [stored[0], stored[2]])
+    inserted = insert_rows(client, 'events', ROWS)
+    assert [row and row['title'] for row in inserted] == ['a', None, 'c']
+
+
+def test_rejected_bulk_retries_rows():
+    """Test that a rejected statement is retried row by row."""
+    print_section("TEST: Rejected bulk insert")
+    client = FakeClient(bulk=APIError({'message': 'bad row'}), reject_titles=('b',))
+    inserted = insert_rows(client, 'events', ROWS)
+    assert [row and row['title'] for row in inserted] == ['a', None, 'c']
+    assert len(client.calls) == 4
+
+
+def test_unknown_outcome_is_not_retried():
+    """Test that a network error doesn't re-insert rows that may be stored."""
+    print_section("TEST: Unknown bulk outcome")
+    client = FakeClient(bulk=TimeoutError('read timed out'))
+    inserted = insert_rows(client, 'events', ROWS)
+    assert inserted == [None, None, None]
+    assert len(client.calls) == 1
+
+
+def run_all_tests():
+    """Run all bulk insert tests."""
+    tests = [
+        ("Bulk insert", test_bulk_insert),
+        ("Partial bulk result", test_partial_result_is_aligned),
+        ("Rejected bulk insert", test_rejected_bulk_retries_rows),
+        ("Unknown bulk outcome", test_unknown_outcome_is_not_retried),
+    ]
+
+    passed = 0
+    failed_tests = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"\n✗ {test_name} FAILED: {e}")
+            failed_tests.append(test_name)
+
+    print_section("TEST SUMMARY")
+    print(f"Passed: {passed}/{len(tests)}")
+    for test_name in failed_tests:
+        print(f"  - {test_name}")
+
+    return 0 if not failed_tests else 1
+
+
+if __name__ == "__main__":
+    exit(run_all_tests())
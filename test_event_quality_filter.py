@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test Script for Event Quality Filter
+
+Tests the event quality filter rules with in-memory sample events,
+without requiring database or OpenAI connections.
+
+Usage:
+    python test_event_quality_filter.py
+
+Author: Cosmic Diary System
+Date: 2026-10-16
+"""
+
+from datetime import date, timedelta
+from typing import Dict
+
+from event_quality_filter import EventQualityFilter, load_filter_config
+
+TODAY = date.today().isoformat()
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+LAST_WEEK = (date.today() - timedelta(days=7)).isoformat()
+
+
+def print_section(title: str):
+    """Print a formatted section header."""
+    print(f"\n{'='*80}")
+    print(f"{title}")
+    print(f"{'='*80}\n")
+
+
+def make_event(title: str, event_date: str = TODAY, **overrides) -> Dict:
+    """Build an event that passes every filter unless overridden."""
+    event = {
+        "title": title,
+        "date": event_date,
+        "description": "A powerful earthquake struck the region causing widespread damage "
+                       "to buildings, roads and power lines across several districts.",
+        "category": "Natural Disasters",
+        "location": "Chennai, Tamil Nadu, India",
+        "impact_level": "high",
+        "impact_metrics": {"deaths": 25, "geographic_scope": "state"},
+        "research_score": 80
+    }
+    event.update(overrides)
+    return event
+
+
+def test_deduplication():
+    """Test duplicate detection against existing events."""
+    print_section("TEST: Deduplication")
+
+    quality_filter = EventQualityFilter(load_filter_config())
+    existing_events = [
+        {"title": "Major earthquake hits Chennai coast", "date": YESTERDAY},
+        {"title": "Cyclone makes landfall near Puri", "date": LAST_WEEK},
+        {"title": "Flood warning issued for Assam", "date": "not-a-date"},
+    ]
+    dedup_index = quality_filter._build_dedup_index(existing_events)
+
+    cases = [
+        ("Major Earthquake Hits Chennai Coast", TODAY, False),   # identical title, within window
+        ("Major earthquake hits Chennai coastline", TODAY, False),  # near-identical title
+        ("Parliament passes new budget bill", TODAY, True),     # unrelated title
+        ("Cyclone makes landfall near Puri", TODAY, True),      # same title, outside window
+        ("Flood warning issued for Assam", TODAY, True),        # existing date unparseable
+        ("Major earthquake hits Chennai coast", "bad-date", True),  # event date unparseable
+    ]
+
+    for title, event_date, expected in cases:
+        result = quality_filter._check_deduplication(make_event(title, event_date), dedup_index)
+        status = "✓" if result == expected else "✗"
+        print(f"   {status} {title[:45]:45} -> {'unique' if result else 'duplicate'}")
+        assert result == expected, f"Unexpected dedup result for {title!r}"
+
+    # Rejections surface through filter_events with the dedup reason
+    filtered, stats = quality_filter.filter_events(
+        [make_event("Major earthquake hits Chennai coast")], existing_events
+    )
+    assert filtered == []
+    assert stats['rejection_reasons'] == {"Duplicate event (already in database)": 1}
+
+
+def run_all_tests():
+    """Run all event quality filter tests."""
+    tests = [
+        ("Deduplication", test_deduplication),
+    ]
+
+    passed = 0
+    failed_tests = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"\n✗ {test_name} FAILED: {e}")
+            failed_tests.append(test_name)
+
+    print_section("TEST SUMMARY")
+    print(f"Passed: {passed}/{len(tests)}")
+    for test_name in failed_tests:
+        print(f"  - {test_name}")
+
+    return 0 if not failed_tests else 1
+
+
+if __name__ == "__main__":
+    exit(run_all_tests())